@@ -0,0 +1,60 @@
+import json, os, threading
+from datetime import datetime, timedelta
+
+from tracks import TRACK_CACHE
+
+##Default location of the local activity list
+ACTIVITY_LIST = os.path.join(os.path.dirname(TRACK_CACHE), "activity_list.json")
+
+class ActivityList():
+    """
+    Activities of every fetched week, saved as json by the Monday of the week
+    Only weeks that are over are kept, as later ones may still get new activities
+    """
+
+    def __init__(self, path : str = ACTIVITY_LIST):
+        """
+
+        Args:
+            path (str, optional): Json file path. Defaults to ACTIVITY_LIST.
+        """
+        self.path = path
+        ##Monday as YYYY-MM-DD -> list of 7 lists of activities
+        self.weeks = {}
+        ##Weeks are added from worker threads
+        self.lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path) as f:
+                self.weeks = json.load(f)
+
+    def get(self, monday : datetime):
+        """Activities of a week
+
+        Args:
+            monday (datetime): Monday of the week
+
+        Returns:
+            list: 7 lists of activities, None if the week is not kept
+        """
+        with self.lock:
+            return self.weeks.get(monday.strftime("%Y-%m-%d"))
+
+    def update(self, weeks : dict):
+        """Keeps the fetched weeks that are over and saves them
+
+        Args:
+            weeks (dict): Monday of the week -> 7 lists of activities
+        """
+        ##Allow a day after the week for activities to be uploaded
+        over = datetime.now() - timedelta(days = 8)
+        complete = {monday.strftime("%Y-%m-%d") : week for monday, week in weeks.items() if monday < over}
+        if not complete:
+            return
+        with self.lock:
+            self.weeks.update(complete)
+            ##Write then rename so a partly written file is never read
+            temp = self.path + ".tmp"
+            with open(temp, "w") as f:
+                json.dump(self.weeks, f)
+            os.replace(temp, self.path)
@@ -1,16 +1,71 @@
+import os, threading, time
 from garminconnect import (
     Garmin,
     GarminConnectConnectionError,
     GarminConnectAuthenticationError,
     GarminConnectTooManyRequestsError,
 )
+from garth.exc import GarthException
+from requests.exceptions import RequestException
 from io import BytesIO
 from datetime import datetime
 
+##Default location of the saved session tokens
+TOKEN_STORE = os.path.join(os.path.expanduser("~"), ".garminconnect")
+
+class RateLimiter():
+    """
+    Token bucket shared between API instances, e.g. one per account in a batch
+    Thread safe, callers block until a request is allowed
+    """
+
+    def __init__(self, rate : float, burst : int = 1):
+        """
+
+        Args:
+            rate (float): Requests allowed per second
+            burst (int, optional): Requests allowed at once after idling. Defaults to 1.
+        """        
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Blocks until a request may be made
+        """        
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            ##Reserve a token, a negative balance is the queue of waiting callers
+            self.tokens -= 1
+            delay = -self.tokens / self.rate
+        if delay > 0:
+            time.sleep(delay)
+
 class API():
 
+    def __init__(self, token_store : str = TOKEN_STORE, rate_limiter : RateLimiter = None):
+        """
+
+        Args:
+            token_store (str, optional): Directory for saved session tokens. Defaults to TOKEN_STORE.
+            rate_limiter (RateLimiter, optional): Limits requests to Garmin Connect. Defaults to None.
+        """        
+        self.token_store = token_store
+        self.rate_limiter = rate_limiter
+
+    def limit(self):
+        """Waits for the rate limiter, if any, before a request
+        """        
+        if self.rate_limiter is not None:
+            self.rate_limiter.wait()
+
     def setup(self, username : str, password : str):
         """Initialises the garmin connect API instance and logs in
+        Saves the session tokens so later launches can resume
 
         Args:
             username (str): Given username, typically email
@@ -21,11 +76,50 @@ class API():
         """        
         try:
             self.garmin = Garmin(username, password)
+            self.limit()
             result = self.garmin.login()
-            return True
-        except GarminConnectAuthenticationError:
+        except (GarminConnectAuthenticationError, GarminConnectConnectionError, GarminConnectTooManyRequestsError,
+                GarthException, RequestException):
+            ##Includes being offline, so a failed login never raises inside a Qt slot
+            return False
+        self.save_tokens()
+        return True
+
+    def resume(self):
+        """Initialises the garmin connect API instance from saved session tokens
+        An expired access token is refreshed by garth on the first request
+
+        Returns:
+            bool: Resume success, False if the user needs to log in again
+        """        
+        if not os.path.isdir(self.token_store):
             return False
-    
+        try:
+            self.garmin = Garmin()
+            self.limit()
+            self.garmin.login(self.token_store)
+        except (FileNotFoundError, GarminConnectAuthenticationError, GarminConnectConnectionError,
+                GarminConnectTooManyRequestsError, GarthException, RequestException):
+            ##Includes being offline, the login widget is shown instead
+            return False
+        ##Store the access token again in case it was refreshed
+        self.save_tokens()
+        return True
+
+    def save_tokens(self):
+        """Writes the session tokens to the token store
+        Only the current user can read the directory and files
+        """        
+        os.makedirs(self.token_store, mode = 0o700, exist_ok = True)
+        os.chmod(self.token_store, 0o700)
+        ##The directory is private, so files can be restricted after writing
+        ##Changing the umask instead is process wide and unsafe with report.py threads
+        self.garmin.garth.dump(self.token_store)
+        for name in os.listdir(self.token_store):
+            path = os.path.join(self.token_store, name)
+            if os.path.isfile(path):
+                os.chmod(path, 0o600)
+
     def get_activities_by_date(self, start_date : datetime, end_date : datetime, activity_type : str = "running"):
         """Retrieves multiple activities within a date range from Garmin API
 
@@ -40,6 +134,7 @@ class API():
         ##Strip text format of date
         start = start_date.strftime("%Y-%m-%d")
         end = end_date.strftime("%Y-%m-%d")
+        self.limit()
         activities = self.garmin.get_activities_by_date(start, end, activity_type)
         ##Sort into chronological order
         activities.sort(key = lambda activity : datetime.strptime(activity["startTimeLocal"], "%Y-%m-%d %H:%M:%S"))
@@ -55,6 +150,7 @@ class API():
         Returns:
             str: Activity data in csv format
         """    
+        self.limit()
         csv_data = self.garmin.download_activity(activity_id, dl_fmt = self.garmin.ActivityDownloadFormat.CSV)
         return csv_data
 
@@ -68,6 +164,7 @@ class API():
         Returns:
             bytes (or str): Activity data in gpx (XML) format
         """    
+        self.limit()
         gpx_data = self.garmin.download_activity(activity_id, dl_fmt = self.garmin.ActivityDownloadFormat.GPX)
         if as_string:
             return gpx_data.decode(encoding = 'utf-8')
@@ -84,6 +181,7 @@ class API():
         Returns:
             bytes (or str): Activity data in tcx (XML) format
         """    
+        self.limit()
         tcx_data = self.garmin.download_activity(activity_id, dl_fmt = self.garmin.ActivityDownloadFormat.TCX)
         if as_string:
             return tcx_data.decode(encoding = 'utf-8')
@@ -0,0 +1,168 @@
+import json, os
+import numpy as np
+
+from tracks import Track, TrackCache, TRACK_CACHE
+
+##Default location of stored best efforts
+BEST_EFFORTS_FILE = os.path.join(os.path.dirname(TRACK_CACHE), "best_efforts.json")
+
+##Distances in metres searched for by default
+DEFAULT_DISTANCES = {
+    "1k" : 1000,
+    "5k" : 5000,
+    "10k" : 10000,
+    "Half Marathon" : 21097.5,
+}
+
+def best_efforts(distance : np.ndarray, time : np.ndarray, distances : dict = DEFAULT_DISTANCES):
+    """Finds the fastest stretch of an activity covering each distance
+    Equivalent to a two-pointer sliding window, with the end pointer for every
+    start found at once by binary search over the cumulative distance
+
+    Args:
+        distance (np.ndarray): Cumulative distance in metres at each trackpoint
+        time (np.ndarray): Seconds since start at each trackpoint
+        distances (dict, optional): Name -> distance in metres. Defaults to DEFAULT_DISTANCES.
+
+    Returns:
+        dict: Name -> (seconds, start second, end second), for distances the activity covers
+    """
+    efforts = {}
+    for name, target in distances.items():
+        if len(distance) == 0 or distance[-1] - distance[0] < target:
+            continue
+        ##First trackpoint at or past the target distance for every start
+        end = np.searchsorted(distance, distance + target, side = "left")
+        starts = np.flatnonzero(end < len(distance))
+        end = end[starts]
+
+        ##Interpolate the time the target distance was reached
+        covered = distance[starts] + target - distance[end - 1]
+        step = distance[end] - distance[end - 1]
+        end_time = time[end - 1] + (time[end] - time[end - 1]) * covered / step
+        elapsed = end_time - time[starts]
+
+        best = np.argmin(elapsed)
+        efforts[name] = (float(elapsed[best]), float(time[starts[best]]), float(end_time[best]))
+    return efforts
+
+def track_best_efforts(track : Track, distances : dict = DEFAULT_DISTANCES):
+    """Finds the best efforts of a track
+
+    Args:
+        track (Track): Full track of activity
+        distances (dict, optional): Name -> distance in metres. Defaults to DEFAULT_DISTANCES.
+
+    Returns:
+        dict: Name -> (seconds, start second, end second)
+    """
+    return best_efforts(track.distance(), track.time, distances)
+
+class BestEffortStore():
+    """
+    Best efforts of every activity and the all-time records, saved as json
+    Records are updated as activities are added, and older activities are
+    only rescanned for distances they have not been searched for
+    """
+
+    def __init__(self, path : str = BEST_EFFORTS_FILE, distances : dict = DEFAULT_DISTANCES):
+        """
+
+        Args:
+            path (str, optional): Json file path. Defaults to BEST_EFFORTS_FILE.
+            distances (dict, optional): Name -> distance in metres. Defaults to DEFAULT_DISTANCES.
+        """
+        self.path = path
+        self.distances = distances
+        ##Activity ID -> name -> [seconds, start second, end second]
+        self.activities = {}
+        ##Name -> [seconds, activity ID]
+        self.records = {}
+        ##Activity ID -> name -> metres of every distance searched for
+        self.scanned = {}
+
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.activities = data["activities"]
+            ##Stores written before distances were tracked are rescanned once
+            self.scanned = data.get("scanned", {})
+            ##Distances may have changed since saving, so records are rebuilt from the stored efforts
+            self.records = self.find_records()
+
+    def find_records(self):
+        """All-time records from the stored efforts of every activity
+        Efforts searched for at a different length are left out until rescanned
+
+        Returns:
+            dict: Name -> [seconds, activity ID]
+        """
+        records = {}
+        for act_id, efforts in self.activities.items():
+            scanned = self.scanned.get(act_id, {})
+            for name, (seconds, _, _) in efforts.items():
+                if name not in self.distances or scanned.get(name) != self.distances[name]:
+                    continue
+                if name not in records or seconds < records[name][0]:
+                    records[name] = [seconds, act_id]
+        return records
+
+    def missing(self, activity_id):
+        """Configured distances an activity has not been searched for
+
+        Args:
+            activity_id (str): Activity ID
+
+        Returns:
+            dict: Name -> distance in metres
+        """
+        scanned = self.scanned.get(str(activity_id), {})
+        return {name : target for name, target in self.distances.items() if scanned.get(name) != target}
+
+    def add(self, activity_id, track : Track):
+        """Stores the best efforts of an activity and updates the records
+        Only distances the activity has not been searched for are searched
+
+        Args:
+            activity_id (str): Activity ID
+            track (Track): Full track of activity
+
+        Returns:
+            list: Names of distances with a new record
+        """
+        distances = self.missing(activity_id)
+        efforts = track_best_efforts(track, distances)
+        stored = self.activities.setdefault(str(activity_id), {})
+        for name in distances:
+            stored.pop(name, None)
+        stored.update({name : list(effort) for name, effort in efforts.items()})
+        self.scanned.setdefault(str(activity_id), {}).update(distances)
+
+        new_records = []
+        for name, (seconds, _, _) in efforts.items():
+            if name not in self.records or seconds < self.records[name][0]:
+                self.records[name] = [seconds, str(activity_id)]
+                new_records.append(name)
+        return new_records
+
+    def update(self, cache : TrackCache):
+        """Searches all cached activities for distances they have not been searched for, then saves
+
+        Args:
+            cache (TrackCache): Track cache
+
+        Returns:
+            list: Names of distances with a new record
+        """
+        new_records = set()
+        for act_id in cache.ids():
+            if self.missing(act_id):
+                new_records.update(self.add(act_id, cache.get(act_id)))
+        self.save()
+        return sorted(new_records, key = lambda name : self.distances[name])
+
+    def save(self):
+        """Writes the best efforts to the json file
+        """
+        with open(self.path, "w") as f:
+            json.dump({"activities" : self.activities, "records" : self.records, "scanned" : self.scanned}, f, indent = 4)
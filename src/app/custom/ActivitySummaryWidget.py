@@ -5,14 +5,15 @@ sys.path.append(parent_dir)
 
 from datetime import datetime
 from io import BytesIO 
-from pandas import read_csv
 from PyQt6.QtCore import Qt 
 from PyQt6.QtGui import QMouseEvent
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QStackedLayout, QLabel
-from xml.etree.ElementTree import parse
 
 from api import API
+from profiling import profiled
+from summary import CSV_CATEGORIES, read_location, read_csv_summary
 
+@profiled
 class ActivitySummaryWidget(QWidget):
     """
     Individual widget used for each activity
@@ -32,7 +33,7 @@ class ActivitySummaryWidget(QWidget):
         ##And gpx and given categories
         ##Temporary format
         self.head_categories = ["Date", "Location"]
-        self.csv_categories = ["Time", "Distance", "Elevation Gain", "Avg Pace", "Avg HR"]
+        self.csv_categories = CSV_CATEGORIES
         
         ##Date above stack
         self.layout = QVBoxLayout()
@@ -53,7 +54,7 @@ class ActivitySummaryWidget(QWidget):
         ##Create frames for each activity
         for act in activities:
             act_id = act["activityId"]
-            gpx_data = BytesIO(api.get_gpx_data(act_id))
+            gpx_data = api.get_gpx_data(act_id)
             csv_data = BytesIO(api.get_csv_data(act_id))
         
             ##Arrange labels vertically
@@ -107,13 +108,7 @@ class ActivitySummaryWidget(QWidget):
             frame (QVBoxLayout): Frame to add location label to
             gpx_data (BytesIO): In memory gpx file for activity
         """    
-        tree = parse(gpx_data)
-        root = tree.getroot()
-
-        namespace = {"gpx" : "http://www.topografix.com/GPX/1/1"}
-        location = root.find(".//gpx:name", namespace)
-
-        self.add_label(frame, str(location.text))
+        self.add_label(frame, read_location(gpx_data))
     
     def add_csv_data(self, frame : QVBoxLayout, csv_data : BytesIO):
         """Adds data from csv file for an activity
@@ -122,11 +117,7 @@ class ActivitySummaryWidget(QWidget):
             frame (QVBoxLayout): Frame to add labels to
             csv_data (BytesIO): In memory csv file for activity
         """        
-        act_data = read_csv(csv_data)
-        summary = act_data.tail(1)
-
-        for cat in self.csv_categories:
-            val = summary[cat].values[0]
+        for val in read_csv_summary(csv_data, self.csv_categories).values():
             self.add_label(frame, str(val))
     
     def mouseReleaseEvent(self, e : QMouseEvent):
@@ -0,0 +1,133 @@
+import sys, os
+current_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+import numpy as np
+from io import BytesIO
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel
+
+from api import API
+from profiling import profiled
+from laps import LapData
+from tracks import parse_gpx
+from custom.TrackChartsWidget import TrackChartsWidget
+from custom.LapTableWidget import LapTableWidget
+from custom.MapWidget import MapWidget
+
+@profiled
+class ActivityViewWidget(QWidget):
+    """
+    Single activity view with a map, charts, an info widget and a table of laps
+    Info widget shows the whole activity, or the selected lap
+    """
+
+    def __init__(self, api : API, activity_id : str):
+        """Creates view of an activity
+        The gpx and csv files are downloaded and parsed once
+
+        Args:
+            api (API): Garmin API instance
+            activity_id (str): Activity ID
+        """
+        super().__init__()
+
+        self.categories = ["Time", "Distance", "Elevation Gain", "Avg Pace", "Avg HR", "Avg Run Cadence"]
+
+        gpx_data = api.get_gpx_data(activity_id)
+        self.track = parse_gpx(gpx_data)
+        gpx_data.seek(0)
+        self.laps = LapData.from_csv(BytesIO(api.get_csv_data(activity_id)))
+        self.categories = [cat for cat in self.categories if cat in self.laps.summary]
+        ##Timer time at the start and end of each lap
+        ends = self.laps.end_times()
+        self.lap_bounds = np.column_stack((np.concatenate(([0.0], ends[:-1])), ends))
+
+        ##Map and charts on left, info and laps on right
+        layout = QHBoxLayout()
+        layout.setContentsMargins(5,5,5,5)
+        layout.setSpacing(5)
+        self.setLayout(layout)
+
+        main_layout = QVBoxLayout()
+        main_layout.setSpacing(5)
+        layout.addLayout(main_layout, stretch = 2)
+
+        self.map_widget = MapWidget(gpx_data)
+        main_layout.addWidget(self.map_widget, stretch = 1)
+
+        ##Charts show their position and zoomed section on the map
+        self.charts = TrackChartsWidget(self.track)
+        self.charts.position_selected.connect(self.show_position)
+        self.charts.section_selected.connect(self.show_section)
+        main_layout.addWidget(self.charts, stretch = 1)
+
+        side_layout = QVBoxLayout()
+        side_layout.setSpacing(5)
+        layout.addLayout(side_layout, stretch = 1)
+
+        ##Info widget, one label per category
+        self.title = QLabel()
+        self.title.setAlignment(Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignVCenter)
+        side_layout.addWidget(self.title)
+        self.stat_labels = {}
+        for cat in self.categories:
+            label = QLabel()
+            label.setAlignment(Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignVCenter)
+            side_layout.addWidget(label)
+            self.stat_labels[cat] = label
+
+        self.lap_table = LapTableWidget(self.laps, ["Laps"] + self.categories if "Laps" in self.laps.summary else self.categories)
+        self.lap_table.lap_selected.connect(self.select_lap)
+        side_layout.addWidget(self.lap_table)
+
+        self.show_stats(None)
+
+    def show_stats(self, lap : int):
+        """Fills the info widget for a lap, or the whole activity if lap is None
+
+        Args:
+            lap (int): Lap index, or None
+        """
+        self.title.setText("Activity" if lap is None else f"Lap {lap + 1}")
+        for cat, label in self.stat_labels.items():
+            label.setText(f"{cat}: {self.laps.value(lap, cat)}")
+
+    def select_lap(self, lap : int):
+        """Slot for lap selection, updates the info and map widgets
+
+        Args:
+            lap (int): Lap index, -1 for whole activity
+        """
+        if lap < 0:
+            self.show_stats(None)
+            self.map_widget.clear_highlight()
+            return
+        self.show_stats(lap)
+
+        ##Lap times are timer time, so laps after a pause start slightly early on the map
+        start, end = np.searchsorted(self.track.time, self.lap_bounds[lap])
+        end = min(end + 1, len(self.track))
+        if end - start > 1:
+            self.map_widget.highlight(self.track.lat[start:end], self.track.lon[start:end])
+
+    def show_position(self, index : int):
+        """Slot for hovering over a chart, marks the trackpoint on the map
+
+        Args:
+            index (int): Trackpoint index
+        """
+        self.map_widget.set_marker(self.track.lat[index], self.track.lon[index])
+
+    def show_section(self, first : int, last : int):
+        """Slot for zooming the charts, highlights the shown section on the map
+
+        Args:
+            first (int): First trackpoint index shown
+            last (int): Last trackpoint index shown
+        """
+        if first == 0 and last == len(self.track) - 1:
+            self.map_widget.clear_highlight()
+        elif last > first:
+            self.map_widget.highlight(self.track.lat[first:last + 1], self.track.lon[first:last + 1])
@@ -0,0 +1,330 @@
+import sys, os
+current_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject, QRect, QRunnable, QSize, QThreadPool, QTimer, pyqtSignal
+from PyQt6.QtGui import QPainter
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QTableView, QStyledItemDelegate, QStyleOptionViewItem, QStyle, QHeaderView
+
+from activity_list import ActivityList
+from api import API
+from profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+##Custom data role holding the list of activities for a day
+ActivitiesRole = Qt.ItemDataRole.UserRole + 1
+
+class WeekFetchSignals(QObject):
+    """
+    Signals of a WeekFetch, which is not a QObject itself
+    """
+
+    ##Week row -> list of 7 lists of activities
+    fetched = pyqtSignal(object)
+    ##First and last week row, and the error
+    failed = pyqtSignal(int, int, str)
+
+class WeekFetch(QRunnable):
+    """
+    Fetches the activities of a range of weeks on a worker thread
+    Results are sent back to the GUI thread through signals
+    """
+
+    def __init__(self, api : API, calendar_start : datetime, first : int, last : int, activity_list : ActivityList):
+        """
+
+        Args:
+            api (API): Garmin API instance
+            calendar_start (datetime): Monday of the first week row
+            first (int): First week row fetched
+            last (int): Last week row fetched
+            activity_list (ActivityList): Local activity list the fetched weeks are saved to
+        """
+        super().__init__()
+
+        self.api = api
+        self.calendar_start = calendar_start
+        self.first = first
+        self.last = last
+        self.activity_list = activity_list
+        self.signals = WeekFetchSignals()
+
+    def run(self):
+        """Fetches the weeks with a single API call and saves them locally
+        """
+        start = self.calendar_start + timedelta(weeks = self.first)
+        end = self.calendar_start + timedelta(weeks = self.last, days = 6)
+        try:
+            activities = self.api.get_activities_by_date(start, end)
+
+            ##Sort activities into their week and day
+            fetched = {row : [[] for _ in range(7)] for row in range(self.first, self.last + 1)}
+            for act in activities:
+                day = (datetime.strptime(act["startTimeLocal"], "%Y-%m-%d %H:%M:%S") - self.calendar_start).days
+                if day // 7 in fetched:
+                    fetched[day // 7][day % 7].append(act)
+
+            self.activity_list.update({self.calendar_start + timedelta(weeks = row) : week for row, week in fetched.items()})
+        except Exception as e:
+            ##Nothing may escape a worker thread, so any failure is reported back instead
+            self.signals.failed.emit(self.first, self.last, f"{type(e).__name__}: {e}")
+            return
+        self.signals.fetched.emit(fetched)
+
+class CalendarModel(QAbstractTableModel):
+    """
+    Model of the activity calendar, one row per week and one column per day
+    Activities are only requested for weeks that are shown, from the local
+    activity list if possible and otherwise from Garmin Connect on a worker
+    thread. Only a bounded number of weeks are kept in memory
+    """
+
+    def __init__(self, api : API, start_date : datetime, end_date : datetime, cache_weeks : int = 104,
+                 activity_list : ActivityList = None, retry_ms : int = 10000):
+        """
+
+        Args:
+            api (API): Garmin API instance
+            start_date (datetime): Start date, moved back to the Monday of its week
+            end_date (datetime): End date, inclusive
+            cache_weeks (int, optional): Maximum number of weeks kept in memory. Defaults to 104.
+            activity_list (ActivityList, optional): Local activity list. Defaults to the one at ACTIVITY_LIST.
+            retry_ms (int, optional): Milliseconds before weeks that failed to fetch are requested again. Defaults to 10000.
+        """
+        super().__init__()
+
+        self.api = api
+        self.start = start_date - timedelta(days = start_date.weekday())
+        self.num_weeks = (end_date - self.start).days // 7 + 1
+        self.cache_weeks = cache_weeks
+        self.activity_list = activity_list or ActivityList()
+        self.retry_ms = retry_ms
+
+        ##Week row -> list of 7 lists of activities, least recently used first
+        self.weeks = OrderedDict()
+        ##Week rows requested by the view but not fetched yet
+        self.pending = set()
+        ##Week rows being fetched, or waiting to be retried
+        self.fetching = set()
+        ##One fetch at a time, so requests to the API are not run in parallel
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(1)
+
+    def rowCount(self, parent : QModelIndex = QModelIndex()):
+        """Number of weeks in the calendar
+        """
+        return 0 if parent.isValid() else self.num_weeks
+
+    def columnCount(self, parent : QModelIndex = QModelIndex()):
+        """Number of days in a week
+        """
+        return 0 if parent.isValid() else 7
+
+    def date(self, index : QModelIndex):
+        """Date of the day shown at an index
+
+        Args:
+            index (QModelIndex): Model index
+
+        Returns:
+            datetime: Date of day
+        """
+        return self.start + timedelta(weeks = index.row(), days = index.column())
+
+    def data(self, index : QModelIndex, role : int = Qt.ItemDataRole.DisplayRole):
+        """Day of month for display, or the activities of the day
+        Activities of a week that is not in memory are scheduled for fetching
+
+        Args:
+            index (QModelIndex): Model index
+            role (int, optional): Data role. Defaults to DisplayRole.
+
+        Returns:
+            str or list: Requested data, None while the week is being fetched
+        """
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.date(index).strftime("%d")
+        if role == ActivitiesRole:
+            row = index.row()
+            if row in self.weeks:
+                self.weeks.move_to_end(row)
+                return self.weeks[row][index.column()]
+            ##Fetch after painting, so all newly visible weeks share one request
+            if row not in self.pending and row not in self.fetching:
+                if not self.pending:
+                    QTimer.singleShot(0, self.fetch_pending)
+                self.pending.add(row)
+            return None
+        return None
+
+    def headerData(self, section : int, orientation : Qt.Orientation, role : int = Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"][section]
+        return (self.start + timedelta(weeks = section)).strftime("%Y-%m-%d")
+
+    def fetch_pending(self):
+        """Shows pending weeks kept in the local activity list, and fetches the
+        rest with a single API call on a worker thread
+        """
+        if not self.pending:
+            return
+        rows = sorted(self.pending)
+        self.pending.clear()
+
+        saved = {}
+        for row in rows:
+            week = self.activity_list.get(self.start + timedelta(weeks = row))
+            if week is not None:
+                saved[row] = week
+        if saved:
+            self.add_weeks(saved)
+
+        missing = [row for row in rows if row not in saved]
+        if not missing:
+            return
+        first, last = missing[0], missing[-1]
+        self.fetching.update(range(first, last + 1))
+        fetch = WeekFetch(self.api, self.start, first, last, self.activity_list)
+        fetch.signals.fetched.connect(self.add_weeks)
+        fetch.signals.failed.connect(self.fetch_failed)
+        self.pool.start(fetch)
+
+    def add_weeks(self, weeks : dict):
+        """Slot for fetched weeks, runs on the GUI thread
+
+        Args:
+            weeks (dict): Week row -> list of 7 lists of activities
+        """
+        for row, week in weeks.items():
+            self.weeks[row] = week
+            self.weeks.move_to_end(row)
+            self.fetching.discard(row)
+        ##Drop the least recently shown weeks
+        while len(self.weeks) > self.cache_weeks:
+            self.weeks.popitem(last = False)
+
+        self.dataChanged.emit(self.index(min(weeks), 0), self.index(max(weeks), 6), [ActivitiesRole])
+
+    def fetch_failed(self, first : int, last : int, error : str):
+        """Slot for a failed fetch, runs on the GUI thread
+        The weeks are requested again when they are painted after a delay
+
+        Args:
+            first (int): First week row
+            last (int): Last week row
+            error (str): Description of the error
+        """
+        logger.warning("Could not fetch activities for weeks %d to %d: %s", first, last, error)
+        QTimer.singleShot(self.retry_ms, lambda: self.retry(first, last))
+
+    def retry(self, first : int, last : int):
+        """Allows failed weeks to be requested again, and repaints them if shown
+
+        Args:
+            first (int): First week row
+            last (int): Last week row
+        """
+        self.fetching.difference_update(range(first, last + 1))
+        self.dataChanged.emit(self.index(first, 0), self.index(last, 6), [ActivitiesRole])
+
+class ActivityDayDelegate(QStyledItemDelegate):
+    """
+    Paints a day of the calendar directly, without creating widgets
+    """
+
+    def paint(self, painter : QPainter, option : QStyleOptionViewItem, index : QModelIndex):
+        """Draws the day of month and one line per activity
+
+        Args:
+            painter (QPainter): Painter of the view
+            option (QStyleOptionViewItem): Cell geometry and state
+            index (QModelIndex): Model index of the day
+        """
+        painter.save()
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        rect = option.rect.adjusted(4, 2, -4, -2)
+
+        ##Day of month in the corner
+        font = painter.font()
+        font.setItalic(True)
+        painter.setFont(font)
+        painter.drawText(rect, Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignTop, index.data())
+        font.setItalic(False)
+        painter.setFont(font)
+
+        activities = index.data(ActivitiesRole)
+        if activities is None:
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, "...")
+        else:
+            ##One line per activity, as many as fit in the cell
+            line_height = option.fontMetrics.height()
+            top = rect.top() + line_height
+            for act in activities:
+                if top + line_height > rect.bottom():
+                    break
+                line = QRect(rect.left(), top, rect.width(), line_height)
+                painter.drawText(line, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, self.activity_text(act))
+                top += line_height
+        painter.restore()
+
+    def sizeHint(self, option : QStyleOptionViewItem, index : QModelIndex):
+        return QSize(110, 4 * option.fontMetrics.height())
+
+    def activity_text(self, act : dict):
+        """Short description of an activity
+
+        Args:
+            act (dict): JSON description of activity
+
+        Returns:
+            str: Distance and duration of activity
+        """
+        distance = (act.get("distance") or 0) / 1000
+        duration = timedelta(seconds = round(act.get("duration") or 0))
+        return f"{distance:.2f} km  {duration}"
+
+@profiled
+class CalendarWidget(QWidget):
+
+    def __init__(self, api : API, start_date : datetime, end_date : datetime):
+        """Creates a scrollable calendar of all activities in a date range
+        Only the weeks in view are fetched and painted
+
+        Args:
+            api (API): Garmin API instance
+            start_date (datetime): Start date
+            end_date (datetime): End date, inclusive
+        """
+        super().__init__()
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(5,5,5,5)
+        self.setLayout(layout)
+
+        self.model = CalendarModel(api, start_date, end_date)
+        self.delegate = ActivityDayDelegate()
+
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.setItemDelegate(self.delegate)
+        self.view.setShowGrid(True)
+
+        ##Fixed row heights so the view never measures rows outside the viewport
+        row_height = 4 * self.view.fontMetrics().height()
+        self.view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.view.verticalHeader().setDefaultSectionSize(row_height)
+        self.view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.view)
+
+        ##Start at the most recent week
+        self.view.scrollToBottom()
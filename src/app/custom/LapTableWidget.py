@@ -0,0 +1,154 @@
+import sys, os
+current_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+import numpy as np
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QItemSelection, pyqtSignal
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QTableView, QAbstractItemView, QHeaderView
+
+from laps import LapData
+from profiling import profiled
+
+class LapTableModel(QAbstractTableModel):
+    """
+    Table model reading straight from the lap columns
+    Sorting only reorders an array of lap indices
+    """
+
+    def __init__(self, laps : LapData, categories : list = None):
+        """
+
+        Args:
+            laps (LapData): Laps of activity
+            categories (list, optional): Columns to show. Defaults to all columns.
+        """
+        super().__init__()
+
+        self.laps = laps
+        self.categories = categories or laps.names
+        ##Row -> lap index
+        self.order = np.arange(len(laps))
+
+    def rowCount(self, parent : QModelIndex = QModelIndex()):
+        """Number of laps
+        """
+        return 0 if parent.isValid() else len(self.order)
+
+    def columnCount(self, parent : QModelIndex = QModelIndex()):
+        """Number of shown columns
+        """
+        return 0 if parent.isValid() else len(self.categories)
+
+    def data(self, index : QModelIndex, role : int = Qt.ItemDataRole.DisplayRole):
+        """Text of a cell
+
+        Args:
+            index (QModelIndex): Model index
+            role (int, optional): Data role. Defaults to DisplayRole.
+
+        Returns:
+            str: Value from csv
+        """
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return str(self.laps.value(self.lap(index.row()), self.categories[index.column()]))
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def headerData(self, section : int, orientation : Qt.Orientation, role : int = Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.categories[section]
+        return None
+
+    def sort(self, column : int, order : Qt.SortOrder = Qt.SortOrder.AscendingOrder):
+        """Sorts rows by a column
+
+        Args:
+            column (int): Column index, -1 for lap order
+            order (Qt.SortOrder, optional): Sort direction. Defaults to AscendingOrder.
+        """
+        self.layoutAboutToBeChanged.emit()
+        ##Laps shown by persistent indexes, e.g. the selection, before sorting
+        old_indexes = self.persistentIndexList()
+        old_laps = [self.lap(index.row()) for index in old_indexes]
+
+        if column < 0:
+            self.order = np.arange(len(self.laps))
+        else:
+            key = self.laps.sort_key(self.categories[column])
+            if order == Qt.SortOrder.DescendingOrder:
+                key = -key
+            ##Stable sort so equal laps stay in lap order either way, and laps without a value go last
+            self.order = np.argsort(key, kind = "stable")
+
+        ##Move persistent indexes to the new row of their lap
+        rows = np.empty(len(self.order), dtype = np.int64)
+        rows[self.order] = np.arange(len(self.order))
+        new_indexes = [self.index(int(rows[lap]), index.column()) for lap, index in zip(old_laps, old_indexes)]
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def lap(self, row : int):
+        """Lap index shown in a row
+
+        Args:
+            row (int): Row index
+
+        Returns:
+            int: Lap index
+        """
+        return int(self.order[row])
+
+@profiled
+class LapTableWidget(QWidget):
+    """
+    Table of the laps of an activity
+    Emits the lap index when the selection changes, or -1 when no lap is selected
+    """
+
+    lap_selected = pyqtSignal(int)
+
+    def __init__(self, laps : LapData, categories : list = None):
+        """Creates lap table
+
+        Args:
+            laps (LapData): Laps of activity
+            categories (list, optional): Columns to show. Defaults to all columns.
+        """
+        super().__init__()
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(5,5,5,5)
+        self.setLayout(layout)
+
+        self.model = LapTableModel(laps, categories)
+
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.view.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.view.verticalHeader().hide()
+        ##Show laps in lap order until the user sorts
+        self.view.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.view.setSortingEnabled(True)
+        self.view.selectionModel().selectionChanged.connect(self.selection_changed)
+        layout.addWidget(self.view)
+
+    def selection_changed(self, selected : QItemSelection, deselected : QItemSelection):
+        """Slot for selection changes of the table
+
+        Args:
+            selected (QItemSelection): Newly selected cells
+            deselected (QItemSelection): Newly deselected cells
+        """
+        rows = self.view.selectionModel().selectedRows()
+        if rows:
+            self.lap_selected.emit(self.model.lap(rows[0].row()))
+        else:
+            self.lap_selected.emit(-1)
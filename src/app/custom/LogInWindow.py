@@ -3,17 +3,22 @@ current_dir = os.path.dirname(os.path.realpath(__file__))
 parent_dir = os.path.dirname(current_dir)
 sys.path.append(parent_dir)
 
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtWidgets import QMainWindow, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QWidget, QMessageBox, QApplication
 
 from api import API
+from profiling import profiled
 
+@profiled
 class LogInWidget(QWidget):
     """Runs the log-in window
     Inherits from QMainWindow
     Sets the Garmin connection for an API instance after authentication
     """    
 
+    ##Emitted once the API instance is logged in
+    logged_in = pyqtSignal()
+
     def __init__(self, api : API):
         """
 
@@ -66,7 +71,7 @@ class LogInWidget(QWidget):
         button_layout.addWidget(clear_button)
 
         layout.addLayout(button_layout)
-
+        self.setLayout(layout)
     
     def submit_entries(self):
         """Slot for submit button signal
@@ -80,10 +85,11 @@ class LogInWidget(QWidget):
             dialog.setWindowTitle("Login")
             dialog.setText("Login successful")
             dialog.exec()
+            self.logged_in.emit()
         else:
             dialog = QMessageBox(self)
             dialog.setWindowTitle("Login")
-            dialog.setText("Login unsuccessful\nInvalid details")
+            dialog.setText("Login unsuccessful\nCheck your details and internet connection")
             dialog.exec()
             self.clear_entries()
     
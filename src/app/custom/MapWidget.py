@@ -1,18 +1,28 @@
+import os
+from folium import TileLayer
 from gpxplotter import read_gpx_file, create_folium_map, add_segment_to_map
 from io import BytesIO
+from PyQt6.QtCore import QUrl
+from PyQt6.QtWebEngineCore import QWebEngineSettings
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtWidgets import QWidget, QVBoxLayout
 
+from heatmap import HeatmapTiles
+from profiling import profiled
 
+
+@profiled
 class MapWidget(QWidget):
     """
     Loads a folium map of gpx file onto a widget
+    Optionally overlays the heatmap of all cached activities
     """    
-    def __init__(self, gpx_data : BytesIO):
+    def __init__(self, gpx_data : BytesIO = None, heatmap : HeatmapTiles = None):
         """Creates map widget from gpx
 
         Args:
-            gpx_data (BytesIO): In memory gpx file for activity
+            gpx_data (BytesIO, optional): In memory gpx file for activity. Defaults to None.
+            heatmap (HeatmapTiles, optional): Heatmap tiles shown as an overlay. Defaults to None.
         """        
         super().__init__()
 
@@ -29,15 +39,65 @@ class MapWidget(QWidget):
 
         ##Create folium map with gpxplotter
         route_map = create_folium_map(tiles = "stamenterrain")
-        for track in read_gpx_file(gpx_data):
-            for _, segment in enumerate(track['segments']):
-                add_segment_to_map(route_map, segment, line_options = line_options)
+        ##Javascript name of the leaflet map, for later overlays
+        self.map_name = route_map.get_name()
+        ##Heatmap tiles are loaded by leaflet, so the page stays small
+        if heatmap is not None:
+            TileLayer(tiles = heatmap.url_template(), attr = "Heatmap", name = "Heatmap", overlay = True,
+                      min_native_zoom = heatmap.zooms[0], max_native_zoom = heatmap.zooms[-1], opacity = 0.8).add_to(route_map)
+            if gpx_data is None and heatmap.bounds is not None:
+                route_map.fit_bounds(heatmap.bounds)
+        if gpx_data is not None:
+            for track in read_gpx_file(gpx_data):
+                for _, segment in enumerate(track['segments']):
+                    add_segment_to_map(route_map, segment, line_options = line_options)
         
         ##Save map to bytes
         data = BytesIO()
         route_map.save(data, close_file = False)
 
         ##Load map onto widget
-        webView = QWebEngineView()
-        webView.setHtml(data.getvalue().decode())
-        layout.addWidget(webView)
\ No newline at end of file
+        self.webView = QWebEngineView()
+        if heatmap is not None:
+            ##Local page so the file:// tiles can be read, remote access for leaflet and base tiles
+            settings = self.webView.settings()
+            settings.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessFileUrls, True)
+            settings.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, True)
+            self.webView.setHtml(data.getvalue().decode(), QUrl.fromLocalFile(os.path.abspath(heatmap.directory) + "/"))
+        else:
+            self.webView.setHtml(data.getvalue().decode())
+        layout.addWidget(self.webView)
+
+    def highlight(self, lat : list, lon : list):
+        """Draws a highlighted section of route over the map and zooms to it
+        Replaces any previous highlight
+
+        Args:
+            lat (list): Latitudes of section
+            lon (list): Longitudes of section
+        """
+        coords = [[float(y), float(x)] for y, x in zip(lat, lon)]
+        self.webView.page().runJavaScript(f"""
+            if (window.highlight) {{ {self.map_name}.removeLayer(window.highlight); }}
+            window.highlight = L.polyline({coords}, {{color : 'blue', weight : 6}}).addTo({self.map_name});
+            {self.map_name}.fitBounds(window.highlight.getBounds());
+        """)
+
+    def set_marker(self, lat : float, lon : float):
+        """Moves a marker showing a position on the route, e.g. from a chart
+
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+        """
+        self.webView.page().runJavaScript(f"""
+            if (!window.position) {{ window.position = L.circleMarker([0, 0], {{radius : 6, color : 'black'}}).addTo({self.map_name}); }}
+            window.position.setLatLng([{float(lat)}, {float(lon)}]);
+        """)
+
+    def clear_highlight(self):
+        """Removes the highlighted section of route
+        """
+        self.webView.page().runJavaScript(f"""
+            if (window.highlight) {{ {self.map_name}.removeLayer(window.highlight); window.highlight = null; }}
+        """)
\ No newline at end of file
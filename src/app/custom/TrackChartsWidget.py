@@ -0,0 +1,185 @@
+import sys, os
+current_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+import numpy as np
+from PyQt6.QtCharts import QChart, QChartView, QLineSeries, QValueAxis
+from PyQt6.QtCore import Qt, QPointF, pyqtSignal
+from PyQt6.QtGui import QPainter, QResizeEvent
+from PyQt6.QtWidgets import QWidget, QVBoxLayout
+
+from downsample import downsample
+from profiling import profiled
+from tracks import Track
+
+class TrackChartView(QChartView):
+    """
+    Line chart of one trackpoint value against distance
+    Only about one point per pixel of the visible range is drawn, and the
+    line is downsampled again whenever the range or size changes
+    """
+
+    ##Emitted with the visible distance range in km
+    range_changed = pyqtSignal(float, float)
+    ##Emitted with the distance in km under the mouse
+    hovered = pyqtSignal(float)
+
+    def __init__(self, distance : np.ndarray, values : np.ndarray, title : str, inverted : bool = False):
+        """
+
+        Args:
+            distance (np.ndarray): Cumulative distance in km
+            values (np.ndarray): Value at each trackpoint, NaN where missing
+            title (str): Chart title with units
+            inverted (bool, optional): Whether smaller values are drawn higher, e.g. for pace. Defaults to False.
+        """
+        super().__init__()
+
+        self.distance = distance
+        self.values = values
+
+        self.series = QLineSeries()
+        chart = QChart()
+        chart.setTitle(title)
+        chart.legend().hide()
+        chart.addSeries(self.series)
+
+        self.x_axis = QValueAxis()
+        self.x_axis.setTitleText("Distance (km)")
+        self.y_axis = QValueAxis()
+        self.y_axis.setReverse(inverted)
+        chart.addAxis(self.x_axis, Qt.AlignmentFlag.AlignBottom)
+        chart.addAxis(self.y_axis, Qt.AlignmentFlag.AlignLeft)
+        self.series.attachAxis(self.x_axis)
+        self.series.attachAxis(self.y_axis)
+
+        ##Full range of data
+        valid = values[~np.isnan(values)]
+        if len(valid):
+            self.y_axis.setRange(float(valid.min()), float(valid.max()))
+        self.x_axis.setRange(0.0, float(distance[-1]) if len(distance) else 1.0)
+
+        self.setChart(chart)
+        self.setRenderHint(QPainter.RenderHint.Antialiasing)
+        ##Drag to zoom in, right click to zoom out
+        self.setRubberBand(QChartView.RubberBand.HorizontalRubberBand)
+        self.setMouseTracking(True)
+
+        self.x_axis.rangeChanged.connect(self.x_range_changed)
+        self.redraw()
+
+    def redraw(self):
+        """Downsamples the visible range to the width of the plot area
+        """
+        width = max(int(self.chart().plotArea().width()), 100)
+        x, y = downsample(self.distance, self.values, self.x_axis.min(), self.x_axis.max(), width)
+        self.series.replace([QPointF(a, b) for a, b in zip(x.tolist(), y.tolist())])
+
+    def x_range_changed(self, start : float, end : float):
+        """Slot for zooming, redraws and notifies linked widgets
+
+        Args:
+            start (float): Smallest distance shown
+            end (float): Largest distance shown
+        """
+        self.redraw()
+        self.range_changed.emit(start, end)
+
+    def set_x_range(self, start : float, end : float):
+        """Shows a distance range, e.g. to follow a linked chart
+
+        Args:
+            start (float): Smallest distance shown
+            end (float): Largest distance shown
+        """
+        if (self.x_axis.min(), self.x_axis.max()) != (start, end):
+            self.x_axis.setRange(start, end)
+
+    def resizeEvent(self, e : QResizeEvent):
+        """Overrides the parent event handler to redraw for the new width
+
+        Args:
+            e (QResizeEvent): Resize event description
+        """
+        super().resizeEvent(e)
+        self.redraw()
+
+    def mouseMoveEvent(self, e):
+        """Overrides the parent event handler to report the distance under the mouse
+
+        Args:
+            e (QMouseEvent): Mouse event description
+        """
+        super().mouseMoveEvent(e)
+        point = self.chart().mapToValue(e.position(), self.series)
+        if self.x_axis.min() <= point.x() <= self.x_axis.max():
+            self.hovered.emit(point.x())
+
+@profiled
+class TrackChartsWidget(QWidget):
+    """
+    Elevation, pace and HR charts of a track with linked distance axes
+    """
+
+    ##Emitted with the trackpoint index under the mouse
+    position_selected = pyqtSignal(int)
+    ##Emitted with the first and last trackpoint index shown
+    section_selected = pyqtSignal(int, int)
+
+    def __init__(self, track : Track):
+        """Creates charts for a track
+
+        Args:
+            track (Track): Full track of activity
+        """
+        super().__init__()
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(5,5,5,5)
+        layout.setSpacing(5)
+        self.setLayout(layout)
+
+        self.distance = track.distance() / 1000
+        ##Set while applying a range to all charts
+        self.syncing = False
+        charts = [
+            (track.ele, "Elevation (m)", False),
+            (track.pace(), "Pace (min/km)", True),
+            (track.hr, "Heart Rate (bpm)", False),
+        ]
+        self.charts = []
+        for values, title, inverted in charts:
+            ##Skip values the device did not record
+            if np.isnan(values).all():
+                continue
+            chart = TrackChartView(self.distance, values, title, inverted)
+            chart.range_changed.connect(self.sync_range)
+            chart.hovered.connect(self.hover)
+            layout.addWidget(chart)
+            self.charts.append(chart)
+
+    def sync_range(self, start : float, end : float):
+        """Slot for zooming any chart, applies the range to all charts
+
+        Args:
+            start (float): Smallest distance shown
+            end (float): Largest distance shown
+        """
+        if self.syncing:
+            return
+        self.syncing = True
+        for chart in self.charts:
+            chart.set_x_range(start, end)
+        self.syncing = False
+        first, last = np.searchsorted(self.distance, [start, end])
+        self.section_selected.emit(int(first), int(min(last, len(self.distance) - 1)))
+
+    def hover(self, distance : float):
+        """Slot for mouse movement over any chart
+
+        Args:
+            distance (float): Distance in km under the mouse
+        """
+        index = int(np.searchsorted(self.distance, distance))
+        self.position_selected.emit(min(index, len(self.distance) - 1))
@@ -8,7 +8,9 @@ from PyQt6.QtWidgets import QWidget, QHBoxLayout
 
 from ActivitySummaryWidget import ActivitySummaryWidget
 from api import API
+from profiling import profiled
 
+@profiled
 class WeeklyWidget(QWidget):
 
     def __init__(self, api : API, start_date : datetime, end_date : datetime):
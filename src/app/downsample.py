@@ -0,0 +1,64 @@
+import numpy as np
+
+def lttb(x : np.ndarray, y : np.ndarray, threshold : int):
+    """Largest-Triangle-Three-Buckets downsampling
+    Keeps the points that best preserve the visual shape of a line
+
+    Args:
+        x (np.ndarray): Increasing x values
+        y (np.ndarray): y values, without NaN
+        threshold (int): Number of points to keep
+
+    Returns:
+        np.ndarray: Indices of kept points, in order
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    ##First and last points are always kept, the rest are split into buckets
+    edges = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    ##Average point of every bucket from cumulative sums
+    x_sums = np.concatenate(([0.0], np.cumsum(x)))
+    y_sums = np.concatenate(([0.0], np.cumsum(y)))
+    counts = np.maximum(edges[1:] - edges[:-1], 1)
+    avg_x = (x_sums[edges[1:]] - x_sums[edges[:-1]]) / counts
+    avg_y = (y_sums[edges[1:]] - y_sums[edges[:-1]]) / counts
+    ##Each bucket is compared with the next bucket's average, the last with the final point
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    kept = np.empty(threshold, dtype = np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for k in range(threshold - 2):
+        start, end = edges[k], max(edges[k + 1], edges[k] + 1)
+        ##Twice the triangle area for every point in the bucket
+        area = np.abs((x[a] - next_x[k]) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y[k] - y[a]))
+        a = start + int(np.argmax(area))
+        kept[k + 1] = a
+    return kept
+
+def downsample(x : np.ndarray, y : np.ndarray, start : float, end : float, threshold : int):
+    """Downsamples the part of a line between two x values
+    Includes one point either side so the line reaches the edges
+
+    Args:
+        x (np.ndarray): Increasing x values
+        y (np.ndarray): y values, NaN where missing
+        start (float): Smallest x shown
+        end (float): Largest x shown
+        threshold (int): Number of points to keep, typically the width in pixels
+
+    Returns:
+        tuple: x and y arrays of kept points
+    """
+    first = max(np.searchsorted(x, start, side = "left") - 1, 0)
+    last = min(np.searchsorted(x, end, side = "right") + 1, len(x))
+    x, y = x[first:last], y[first:last]
+    valid = ~np.isnan(y)
+    x, y = x[valid], y[valid]
+    kept = lttb(x, y, threshold)
+    return x[kept], y[kept]
@@ -0,0 +1,247 @@
+import json, os, struct, zlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from tracks import Track, TrackCache, TRACK_CACHE
+
+##Default location of heatmap tiles
+HEATMAP_TILES = os.path.join(os.path.dirname(TRACK_CACHE), "heatmap")
+
+TILE_SIZE = 256
+
+##Number of activities through a pixel drawn at full intensity
+SATURATION = 30
+
+def world_pixels(lat : np.ndarray, lon : np.ndarray, zoom : int):
+    """Web Mercator pixel coordinates, as used by slippy map tiles
+
+    Args:
+        lat (np.ndarray): Latitudes in degrees
+        lon (np.ndarray): Longitudes in degrees
+        zoom (int): Zoom level
+
+    Returns:
+        tuple: x and y arrays of pixels from the top left of the world
+    """
+    size = TILE_SIZE * 2 ** zoom
+    lat = np.clip(lat, -85.05112878, 85.05112878)
+    x = (lon + 180) / 360 * size
+    y = (1 - np.log(np.tan(np.radians(lat)) + 1 / np.cos(np.radians(lat))) / np.pi) / 2 * size
+    return x, y
+
+def rasterize(lat : np.ndarray, lon : np.ndarray, zoom : int):
+    """Pixels a track passes through at a zoom level
+    Each segment is sampled at least once per pixel, and each pixel is counted once
+
+    Args:
+        lat (np.ndarray): Latitudes in degrees
+        lon (np.ndarray): Longitudes in degrees
+        zoom (int): Zoom level
+
+    Returns:
+        dict: (zoom, tile x, tile y) -> flat pixel indices within the tile
+    """
+    if len(lat) < 2:
+        return {}
+    x, y = world_pixels(lat, lon, zoom)
+
+    ##Interpolate along every segment at steps shorter than a pixel
+    steps = np.ceil(np.hypot(np.diff(x), np.diff(y))).astype(np.int64) + 1
+    segment = np.repeat(np.arange(len(steps)), steps)
+    offset = np.arange(len(segment)) - np.repeat(np.cumsum(steps) - steps, steps)
+    fraction = offset / steps[segment]
+    px = (x[segment] + (x[segment + 1] - x[segment]) * fraction).astype(np.int64)
+    py = (y[segment] + (y[segment + 1] - y[segment]) * fraction).astype(np.int64)
+
+    world = TILE_SIZE * 2 ** zoom
+    pixels = np.unique(py * world + px)
+    px, py = pixels % world, pixels // world
+
+    tiles = {}
+    tile_ids = (py // TILE_SIZE) * 2 ** zoom + px // TILE_SIZE
+    order = np.argsort(tile_ids, kind = "stable")
+    tile_ids, px, py = tile_ids[order], px[order], py[order]
+    bounds = np.flatnonzero(np.diff(tile_ids)) + 1
+    for ids, xs, ys in zip(np.split(tile_ids, bounds), np.split(px, bounds), np.split(py, bounds)):
+        tile_x, tile_y = int(ids[0] % 2 ** zoom), int(ids[0] // 2 ** zoom)
+        tiles[(zoom, tile_x, tile_y)] = ((ys % TILE_SIZE) * TILE_SIZE + xs % TILE_SIZE).astype(np.uint16)
+    return tiles
+
+def rasterize_file(path : str, zooms : list):
+    """Process pool task, rasterizes a cached track at every zoom level
+
+    Args:
+        path (str): Track .npz file
+        zooms (list): Zoom levels
+
+    Returns:
+        tuple: (zoom, tile x, tile y) -> flat pixel indices within the tile, and the track's bounds
+    """
+    track = Track.load(path)
+    tiles = {}
+    for zoom in zooms:
+        tiles.update(rasterize(track.lat, track.lon, zoom))
+    if len(track) == 0:
+        return tiles, None
+    return tiles, [[float(track.lat.min()), float(track.lon.min())], [float(track.lat.max()), float(track.lon.max())]]
+
+def render(counts : np.ndarray):
+    """Colours a tile of counts, transparent where no activity passed
+
+    Args:
+        counts (np.ndarray): (256, 256) activity counts
+
+    Returns:
+        np.ndarray: (256, 256, 4) RGBA image
+    """
+    ##Log scale against a fixed saturation, so neighbouring tiles match
+    level = np.clip(np.log1p(counts) / np.log1p(SATURATION), 0, 1)
+    image = np.zeros(counts.shape + (4,), dtype = np.uint8)
+    image[..., 0] = 255
+    image[..., 1] = (level * 255).astype(np.uint8)
+    image[..., 2] = (np.clip(level * 2 - 1, 0, 1) * 255).astype(np.uint8)
+    image[..., 3] = np.where(counts > 0, (0.4 + 0.6 * level) * 255, 0).astype(np.uint8)
+    return image
+
+def encode_png(image : np.ndarray):
+    """Encodes an RGBA image as png
+
+    Args:
+        image (np.ndarray): (height, width, 4) uint8 array
+
+    Returns:
+        bytes: Png file
+    """
+    height, width, _ = image.shape
+    ##Filter type 0 at the start of every row
+    raw = np.concatenate((np.zeros((height, 1), dtype = np.uint8), image.reshape(height, width * 4)), axis = 1)
+
+    def chunk(kind : bytes, data : bytes):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + chunk(b"IEND", b"")
+
+def update_tile(directory : str, tile : tuple, activities : dict):
+    """Process pool task, adds activities to a tile's counts and renders it
+    Activities the counts already include are skipped, so an interrupted update can be run again
+
+    Args:
+        directory (str): Heatmap directory
+        tile (tuple): (zoom, tile x, tile y)
+        activities (dict): Activity ID -> array of flat pixel indices
+    """
+    zoom, x, y = tile
+    counts_path = os.path.join(directory, "counts", f"{zoom}_{x}_{y}.npz")
+    counts = np.zeros(TILE_SIZE * TILE_SIZE, dtype = np.uint32)
+    included = np.array([], dtype = np.int64)
+    if os.path.exists(counts_path):
+        with np.load(counts_path) as data:
+            counts, included = data["counts"], data["included"]
+
+    counted = set(included.tolist())
+    new = [act_id for act_id in activities if act_id not in counted]
+    if new:
+        counts = counts + np.bincount(np.concatenate([activities[act_id] for act_id in new]),
+                                      minlength = TILE_SIZE * TILE_SIZE).astype(np.uint32)
+        included = np.concatenate((included, np.array(new, dtype = np.int64)))
+        ##Counts and the activities in them are written together, then renamed so neither is seen half written
+        temp = counts_path + ".tmp"
+        with open(temp, "wb") as f:
+            np.savez_compressed(f, counts = counts, included = included)
+        os.replace(temp, counts_path)
+
+    tile_dir = os.path.join(directory, str(zoom), str(x))
+    os.makedirs(tile_dir, exist_ok = True)
+    with open(os.path.join(tile_dir, f"{y}.png"), "wb") as f:
+        f.write(encode_png(render(counts.reshape(TILE_SIZE, TILE_SIZE))))
+
+class HeatmapTiles():
+    """
+    Heatmap of all cached tracks as slippy map tiles, {zoom}/{x}/{y}.png
+    Per-tile counts are kept so new activities only redraw the tiles they touch
+    """
+
+    def __init__(self, directory : str = HEATMAP_TILES, zooms : list = range(8, 16)):
+        """
+
+        Args:
+            directory (str, optional): Tile directory. Defaults to HEATMAP_TILES.
+            zooms (list, optional): Zoom levels rendered. Defaults to 8 to 15.
+        """
+        self.directory = directory
+        self.zooms = list(zooms)
+        os.makedirs(os.path.join(directory, "counts"), exist_ok = True)
+
+        ##Activity IDs already drawn and the lat/lon bounds of all of them
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.included = set()
+        self.bounds = None
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if manifest["zooms"] == self.zooms:
+                self.included = set(manifest["included"])
+                self.bounds = manifest["bounds"]
+            else:
+                ##Zoom levels changed, so redraw everything from scratch
+                for name in os.listdir(os.path.join(directory, "counts")):
+                    os.remove(os.path.join(directory, "counts", name))
+
+    def update(self, cache : TrackCache, workers : int = None):
+        """Draws all cached tracks that are not in the heatmap yet
+
+        Args:
+            cache (TrackCache): Track cache
+            workers (int, optional): Processes used. Defaults to one per CPU.
+
+        Returns:
+            int: Number of tiles redrawn
+        """
+        new_ids = [act_id for act_id in cache.ids() if act_id not in self.included]
+        if not new_ids:
+            return 0
+
+        with ProcessPoolExecutor(max_workers = workers) as pool:
+            ##Rasterize new tracks in parallel, then group their pixels by tile
+            changes = {}
+            paths = [cache.path(act_id) for act_id in new_ids]
+            results = pool.map(rasterize_file, paths, [self.zooms] * len(paths), chunksize = 4)
+            for act_id, (tiles, bounds) in zip(new_ids, results):
+                for tile, pixels in tiles.items():
+                    changes.setdefault(tile, {})[act_id] = pixels
+                if bounds is not None:
+                    self.extend_bounds(bounds)
+
+            ##Each touched tile is updated and rendered by one process
+            tiles = list(changes)
+            list(pool.map(update_tile, [self.directory] * len(tiles), tiles, [changes[tile] for tile in tiles], chunksize = 16))
+
+        ##Tiles record their own activities, so if this is never reached the next update only redraws them
+        self.included.update(new_ids)
+        temp = self.manifest_path + ".tmp"
+        with open(temp, "w") as f:
+            json.dump({"zooms" : self.zooms, "included" : sorted(self.included), "bounds" : self.bounds}, f)
+        os.replace(temp, self.manifest_path)
+        return len(tiles)
+
+    def extend_bounds(self, bounds : list):
+        """Grows the heatmap bounds to include a track's bounds
+
+        Args:
+            bounds (list): [[south, west], [north, east]]
+        """
+        (south, west), (north, east) = bounds
+        if self.bounds is not None:
+            (s, w), (n, e) = self.bounds
+            south, west, north, east = min(south, s), min(west, w), max(north, n), max(east, e)
+        self.bounds = [[south, west], [north, east]]
+
+    def url_template(self):
+        """Tile url for leaflet
+
+        Returns:
+            str: file:// url with {z}, {x} and {y} placeholders
+        """
+        return Path(self.directory).resolve().as_uri() + "/{z}/{x}/{y}.png"
@@ -0,0 +1,118 @@
+import numpy as np
+from io import BytesIO
+from pandas import read_csv
+
+class LapData():
+    """
+    Laps of an activity from the Garmin csv, held column by column
+    The final "Summary" row is kept apart from the laps
+    """
+
+    def __init__(self, columns : dict, summary : dict):
+        """
+
+        Args:
+            columns (dict): Column name -> array with one value per lap
+            summary (dict): Column name -> value for whole activity
+        """
+        self.columns = columns
+        self.summary = summary
+        self.names = list(columns)
+        ##Column name -> numeric sort key, built when first needed
+        self.sort_keys = {}
+
+    @staticmethod
+    def from_csv(csv_data : BytesIO):
+        """Parses the csv file of an activity
+
+        Args:
+            csv_data (BytesIO): In memory csv file for activity
+
+        Returns:
+            LapData: Laps of activity
+        """
+        act_data = read_csv(csv_data)
+        ##Summary row is last, the remaining rows are laps
+        summary = act_data.tail(1)
+        laps = act_data.iloc[:-1]
+        columns = {name : laps[name].to_numpy() for name in act_data.columns}
+        return LapData(columns, {name : summary[name].values[0] for name in act_data.columns})
+
+    def __len__(self):
+        return len(self.columns[self.names[0]]) if self.names else 0
+
+    def value(self, lap : int, name : str):
+        """Value of a column for a lap, or the summary if lap is None
+
+        Args:
+            lap (int): Lap index, or None for whole activity
+            name (str): Column name
+
+        Returns:
+            Value from csv
+        """
+        if lap is None:
+            return self.summary[name]
+        return self.columns[name][lap]
+
+    def sort_key(self, name : str):
+        """Numeric version of a column for sorting
+        Times and paces are converted to seconds, and values that are not numbers,
+        e.g. "--" for a lap without heart rate, are NaN. Columns without any
+        numbers sort as text
+
+        Args:
+            name (str): Column name
+
+        Returns:
+            np.ndarray: One float key per lap
+        """
+        if name not in self.sort_keys:
+            column = self.columns[name]
+            if column.dtype.kind in "biuf":
+                key = column.astype(float)
+            else:
+                key = np.array([sort_value(val) for val in column])
+                if len(key) and np.isnan(key).all():
+                    ##Rank of the text, so the key is numeric either way
+                    key = np.unique(column.astype(str), return_inverse = True)[1].astype(float)
+            self.sort_keys[name] = key
+        return self.sort_keys[name]
+
+    def end_times(self):
+        """Timer time at the end of each lap
+
+        Returns:
+            np.ndarray: Seconds since start
+        """
+        if "Cumulative Time" in self.columns:
+            return self.sort_key("Cumulative Time")
+        return np.cumsum(self.sort_key("Time"))
+
+def duration_seconds(text) -> float:
+    """Converts a Garmin time or pace, e.g. "1:02:03.4", to seconds
+
+    Args:
+        text (str): Time as [h:]mm:ss[.s]
+
+    Returns:
+        float: Seconds
+    """
+    seconds = 0.0
+    for part in str(text).split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+def sort_value(value) -> float:
+    """Converts a csv value to a number, e.g. "1,043" calories or a time
+
+    Args:
+        value: Value from csv
+
+    Returns:
+        float: Number, NaN if the value is not one
+    """
+    try:
+        return duration_seconds(str(value).replace(",", ""))
+    except ValueError:
+        return np.nan
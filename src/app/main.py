@@ -3,13 +3,16 @@ current_dir = os.path.dirname(os.path.realpath(__file__))
 parent_dir = os.path.dirname(current_dir)
 sys.path.append(parent_dir)
 
+import argparse, logging
 from datetime import datetime 
 from PyQt6.QtWidgets import QMainWindow, QApplication
 
 from api import API
 from custom.MapWidget import MapWidget
 from custom.LogInWindow import LogInWidget
+from profiling import Profiler, profiled
 
+@profiled
 class MainWindow(QMainWindow):
 
   def __init__(self, api: API):
@@ -22,13 +25,34 @@ class MainWindow(QMainWindow):
     self.setCentralWidget(MapWidget(gpx))
 
 if __name__ == "__main__":
-  valid = False
-  while not valid:
-    email = input("Enter email: ")
-    password = input("Enter password: ")
-    api = API()
-    valid = api.setup(email, password)
-  app = QApplication(sys.argv)
-  window = MainWindow(api)
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--profile", metavar = "TRACE", help = "log event loop stalls and write a trace file")
+  parser.add_argument("--cprofile", metavar = "STATS", help = "also write cProfile stats when profiling")
+  parser.add_argument("--stall-ms", type = int, default = 200, help = "event loop stall threshold")
+  # Remaining arguments are left for Qt
+  args, qt_args = parser.parse_known_args()
+
+  app = QApplication(sys.argv[:1] + qt_args)
+  if args.profile:
+    logging.basicConfig(level = logging.INFO)
+    profiler = Profiler(args.profile, args.cprofile, args.stall_ms / 1000)
+    profiler.start()
+    app.aboutToQuit.connect(profiler.stop)
+  api = API()
+  # Saved session skips the login handshake
+  if api.resume():
+    window = MainWindow(api)
+  else:
+    window = LogInWidget(api)
+
+    def open_main():
+      global window
+      # Show the main window first so closing the login never leaves no windows open
+      login = window
+      window = MainWindow(api)
+      window.show()
+      login.close()
+
+    window.logged_in.connect(open_main)
   window.show()
   app.exec()
\ No newline at end of file
@@ -0,0 +1,184 @@
+import cProfile, functools, json, logging, os, sys, threading, time, traceback
+from PyQt6.QtCore import QObject, QTimer
+
+logger = logging.getLogger(__name__)
+
+class Tracer():
+    """
+    Collects timed events in the Chrome trace event format
+    Saved files open in chrome://tracing or https://ui.perfetto.dev
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.lock = threading.Lock()
+
+    def now(self):
+        """Current trace time in microseconds
+        """
+        return time.perf_counter_ns() / 1000
+
+    def complete(self, name : str, start : float, duration : float, category : str = "app", args : dict = None, tid : int = None):
+        """Records an event with a duration
+
+        Args:
+            name (str): Event name
+            start (float): Start time from Tracer.now
+            duration (float): Duration in microseconds
+            category (str, optional): Event category. Defaults to "app".
+            args (dict, optional): Extra details shown with the event. Defaults to None.
+            tid (int, optional): Thread the event happened on. Defaults to the calling thread.
+        """
+        event = {
+            "name" : name, "cat" : category, "ph" : "X", "ts" : start, "dur" : duration,
+            "pid" : os.getpid(), "tid" : tid or threading.get_ident(), "args" : args or {},
+        }
+        with self.lock:
+            self.events.append(event)
+
+    def save(self, path : str):
+        """Writes all events to a trace file
+
+        Args:
+            path (str): File path, typically .json
+        """
+        with self.lock:
+            events = list(self.events)
+        ##Name the threads so the viewer shows which one is the GUI thread
+        for thread in threading.enumerate():
+            events.append({"name" : "thread_name", "ph" : "M", "pid" : os.getpid(), "tid" : thread.ident,
+                           "args" : {"name" : "GUI" if thread is threading.main_thread() else thread.name}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents" : events, "displayTimeUnit" : "ms"}, f)
+
+##Shared tracer, only records while profiling is started
+tracer = Tracer()
+
+def profiled(cls):
+    """Class decorator timing construction of a widget
+
+    Args:
+        cls (type): Widget class
+
+    Returns:
+        type: Same class, with a timed __init__
+    """
+    init = cls.__init__
+
+    @functools.wraps(init)
+    def timed_init(self, *args, **kwargs):
+        if not tracer.enabled:
+            return init(self, *args, **kwargs)
+        start = tracer.now()
+        try:
+            return init(self, *args, **kwargs)
+        finally:
+            tracer.complete(f"{cls.__name__}.__init__", start, tracer.now() - start, "construct")
+
+    cls.__init__ = timed_init
+    return cls
+
+class StallWatchdog(QObject):
+    """
+    Detects when the Qt event loop is blocked for longer than a threshold
+    A timer on the GUI thread records heartbeats, and a background thread
+    captures the GUI thread's stack when they stop
+    """
+
+    def __init__(self, threshold : float = 0.2, interval : float = 0.05):
+        """
+
+        Args:
+            threshold (float, optional): Seconds without a heartbeat counted as a stall. Defaults to 0.2.
+            interval (float, optional): Seconds between heartbeats. Defaults to 0.05.
+        """
+        super().__init__()
+
+        self.threshold = threshold
+        self.interval = interval
+        self.gui_thread = threading.get_ident()
+        self.last_beat = time.perf_counter()
+        ##Stack captured during the current stall, None while responsive
+        self.stall_stack = None
+        self.stopped = threading.Event()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(int(interval * 1000))
+        self.timer.timeout.connect(self.beat)
+        self.thread = threading.Thread(target = self.watch, name = "StallWatchdog", daemon = True)
+
+    def start(self):
+        """Starts heartbeats and watching
+        """
+        self.last_beat = time.perf_counter()
+        self.timer.start()
+        self.thread.start()
+
+    def stop(self):
+        """Stops watching
+        """
+        self.timer.stop()
+        self.stopped.set()
+
+    def beat(self):
+        """Slot for heartbeat timer, runs on the GUI thread
+        Records the stall that just ended, if any
+        """
+        now = time.perf_counter()
+        stack = self.stall_stack
+        self.stall_stack = None
+        ##Time beyond the expected heartbeat interval
+        blocked = now - self.last_beat - self.interval
+        ##The watcher may store a stack just after a short stall ended, so check the threshold here too
+        if stack is not None and blocked > self.threshold:
+            logger.warning("Event loop blocked for %.0f ms in:\n%s", blocked * 1000, stack)
+            start = tracer.now() - blocked * 1e6
+            tracer.complete("Event loop blocked", start, blocked * 1e6, "stall", {"stack" : stack}, self.gui_thread)
+        self.last_beat = now
+
+    def watch(self):
+        """Runs on the watchdog thread, capturing the stack once per stall
+        """
+        while not self.stopped.wait(self.interval):
+            if self.stall_stack is None and time.perf_counter() - self.last_beat - self.interval > self.threshold:
+                frame = sys._current_frames().get(self.gui_thread)
+                if frame is not None:
+                    self.stall_stack = "".join(traceback.format_stack(frame))
+
+class Profiler():
+    """
+    Profiling mode of the app: stall watchdog, construction timing and optional cProfile
+    """
+
+    def __init__(self, trace_path : str, cprofile_path : str = None, threshold : float = 0.2):
+        """
+
+        Args:
+            trace_path (str): Trace file written on stop
+            cprofile_path (str, optional): cProfile stats file written on stop. Defaults to None.
+            threshold (float, optional): Seconds the event loop may block before it is logged. Defaults to 0.2.
+        """
+        self.trace_path = trace_path
+        self.cprofile_path = cprofile_path
+        self.watchdog = StallWatchdog(threshold)
+        self.profile = cProfile.Profile() if cprofile_path else None
+
+    def start(self):
+        """Starts profiling, call after creating the QApplication
+        """
+        tracer.enabled = True
+        self.watchdog.start()
+        if self.profile is not None:
+            self.profile.enable()
+
+    def stop(self):
+        """Stops profiling and writes the output files
+        """
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(self.cprofile_path)
+        self.watchdog.stop()
+        tracer.enabled = False
+        tracer.save(self.trace_path)
+        logger.warning("Trace written to %s", self.trace_path)
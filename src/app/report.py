@@ -0,0 +1,164 @@
+"""Headless weekly reports for many Garmin Connect accounts
+
+Usage:
+    python report.py profiles.json [--start 2022-05-02] [--end 2022-05-08] [--out reports]
+
+The profiles file is a json list of accounts, e.g.
+    [{"name" : "alice", "email" : "alice@example.com", "password_env" : "ALICE_PASSWORD"}]
+Passwords are only needed when an account has no saved session.
+"""
+import argparse, html, json, os, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pandas import DataFrame
+
+from api import API, RateLimiter, TOKEN_STORE
+from summary import CSV_CATEGORIES, summarise_activity
+
+def profile_api(profile : dict, rate_limiter : RateLimiter):
+    """Logs in to an account, resuming its saved session where possible
+
+    Args:
+        profile (dict): Account with name, email and password or password_env
+        rate_limiter (RateLimiter): Limiter shared by all accounts
+
+    Returns:
+        API: Logged in API instance, None if login failed
+    """
+    api = API(os.path.join(TOKEN_STORE, "profiles", profile["name"]), rate_limiter)
+    if api.resume():
+        return api
+    password = profile.get("password") or os.environ.get(profile.get("password_env", ""), "")
+    if password and api.setup(profile["email"], password):
+        return api
+    return None
+
+def account_report(profile : dict, start_date : datetime, end_date : datetime, rate_limiter : RateLimiter, categories : list = CSV_CATEGORIES):
+    """Summarises all activities of one account in a date range
+
+    Args:
+        profile (dict): Account with name, email and password or password_env
+        start_date (datetime): Start of date range
+        end_date (datetime): End of date range, inclusive
+        rate_limiter (RateLimiter): Limiter shared by all accounts
+        categories (list, optional): Csv columns to report. Defaults to CSV_CATEGORIES.
+
+    Returns:
+        dict: Activity summaries, totals, timings in seconds and any error
+    """
+    report = {"name" : profile["name"], "activities" : [], "totals" : {}, "timings" : {}, "error" : None}
+    started = time.perf_counter()
+    try:
+        api = profile_api(profile, rate_limiter)
+        report["timings"]["login"] = time.perf_counter() - started
+        if api is None:
+            report["error"] = "Login failed"
+            return report
+
+        activities = api.get_activities_by_date(start_date, end_date)
+        summaries_started = time.perf_counter()
+        report["activities"] = [summarise_activity(api, act, categories) for act in activities]
+        report["timings"]["summaries"] = time.perf_counter() - summaries_started
+
+        report["totals"] = {
+            "Activities" : len(activities),
+            "Distance (km)" : round(sum(act.get("distance") or 0 for act in activities) / 1000, 2),
+            "Time" : str(timedelta(seconds = round(sum(act.get("duration") or 0 for act in activities)))),
+        }
+    except Exception as e:
+        ##One failing account should not stop the batch
+        report["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        report["timings"]["total"] = time.perf_counter() - started
+    return report
+
+def batch_report(profiles : list, start_date : datetime, end_date : datetime, workers : int = 8, rate : float = 2.0):
+    """Runs account reports concurrently, sharing one rate limiter
+
+    Args:
+        profiles (list): Accounts
+        start_date (datetime): Start of date range
+        end_date (datetime): End of date range, inclusive
+        workers (int, optional): Accounts processed at once. Defaults to 8.
+        rate (float, optional): Requests per second across all accounts. Defaults to 2.0.
+
+    Returns:
+        list: Account reports in profile order
+    """
+    rate_limiter = RateLimiter(rate, burst = workers)
+    with ThreadPoolExecutor(max_workers = workers) as pool:
+        futures = [pool.submit(account_report, profile, start_date, end_date, rate_limiter) for profile in profiles]
+        reports = []
+        for future in futures:
+            report = future.result()
+            status = report["error"] or f"{len(report['activities'])} activities"
+            print(f"{report['name']}: {status} in {report['timings']['total']:.2f}s")
+            reports.append(report)
+    return reports
+
+def write_json(reports : list, path : str):
+    """Writes the reports as json
+    """
+    with open(path, "w") as f:
+        json.dump(reports, f, indent = 4, default = str)
+
+def write_csv(reports : list, path : str):
+    """Writes one row per activity, with the athlete's name first
+    """
+    rows = [{"Athlete" : report["name"], **activity} for report in reports for activity in report["activities"]]
+    DataFrame(rows).to_csv(path, index = False)
+
+def write_html(reports : list, path : str, start_date : datetime, end_date : datetime):
+    """Writes a page with a totals table and one activity table per athlete
+    """
+    period = f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
+    totals = DataFrame([
+        {"Athlete" : report["name"], **report["totals"], "Error" : report["error"] or "",
+         "Seconds" : round(report["timings"]["total"], 2)}
+        for report in reports
+    ])
+    parts = [f"<html><head><meta charset='utf-8'><title>Weekly report {period}</title></head><body>",
+             f"<h1>Weekly report {period}</h1>", totals.to_html(index = False)]
+    for report in reports:
+        parts.append(f"<h2>{html.escape(report['name'])}</h2>")
+        if report["activities"]:
+            parts.append(DataFrame(report["activities"]).to_html(index = False))
+        else:
+            parts.append("<p>No activities</p>")
+    parts.append("</body></html>")
+    with open(path, "w", encoding = "utf-8") as f:
+        f.write("\n".join(parts))
+
+def last_week():
+    """Monday and Sunday of the previous week
+    """
+    today = datetime.combine(datetime.today().date(), datetime.min.time())
+    monday = today - timedelta(days = today.weekday() + 7)
+    return monday, monday + timedelta(days = 6)
+
+def main(argv : list = None):
+    default_start, default_end = last_week()
+    parser = argparse.ArgumentParser(description = "Weekly activity reports for many Garmin Connect accounts")
+    parser.add_argument("profiles", help = "json file of account profiles")
+    parser.add_argument("--start", type = lambda s : datetime.strptime(s, "%Y-%m-%d"), default = default_start, help = "first day, YYYY-MM-DD")
+    parser.add_argument("--end", type = lambda s : datetime.strptime(s, "%Y-%m-%d"), default = default_end, help = "last day, YYYY-MM-DD")
+    parser.add_argument("--out", default = "reports", help = "output directory")
+    parser.add_argument("--workers", type = int, default = 8, help = "accounts processed at once")
+    parser.add_argument("--rate", type = float, default = 2.0, help = "requests per second across all accounts")
+    args = parser.parse_args(argv)
+
+    with open(args.profiles) as f:
+        profiles = json.load(f)
+
+    started = time.perf_counter()
+    reports = batch_report(profiles, args.start, args.end, args.workers, args.rate)
+    print(f"{len(reports)} accounts in {time.perf_counter() - started:.2f}s")
+
+    os.makedirs(args.out, exist_ok = True)
+    write_json(reports, os.path.join(args.out, "report.json"))
+    write_csv(reports, os.path.join(args.out, "report.csv"))
+    write_html(reports, os.path.join(args.out, "report.html"), args.start, args.end)
+    return 0 if all(report["error"] is None for report in reports) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
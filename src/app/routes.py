@@ -0,0 +1,453 @@
+import pickle
+import numpy as np
+from collections import Counter
+
+from tracks import Track, TrackCache, EARTH_RADIUS
+
+class Route():
+    """
+    Simplified route of an activity
+    Points are resampled at an even spacing along the track, with the time
+    each point was passed
+    """
+
+    def __init__(self, lat : np.ndarray, lon : np.ndarray, time : np.ndarray):
+        """
+
+        Args:
+            lat (np.ndarray): Latitudes in degrees
+            lon (np.ndarray): Longitudes in degrees
+            time (np.ndarray): Seconds since start of activity
+        """
+        self.lat = lat
+        self.lon = lon
+        self.time = time
+
+    @staticmethod
+    def from_track(track : Track, spacing : float = 20):
+        """Resamples a track at an even spacing
+
+        Args:
+            track (Track): Full track of activity
+            spacing (float, optional): Distance between points in metres. Defaults to 20.
+
+        Returns:
+            Route: Simplified route
+        """
+        ##Indoor activities have no trackpoints
+        if len(track) == 0:
+            return Route(np.array([]), np.array([]), np.array([]))
+        distance = track.distance()
+        samples = np.minimum(np.arange(0, distance[-1] + spacing, spacing), distance[-1])
+        ##Distance is non-decreasing, so interp is valid even with pauses
+        return Route(np.interp(samples, distance, track.lat),
+                     np.interp(samples, distance, track.lon),
+                     np.interp(samples, distance, track.time))
+
+    def __len__(self):
+        return len(self.lat)
+
+def project(lat, lon, lat0 : float):
+    """Equirectangular projection to metres around a reference latitude
+    Accurate over the extent of a run
+
+    Args:
+        lat (np.ndarray): Latitudes in degrees
+        lon (np.ndarray): Longitudes in degrees
+        lat0 (float): Reference latitude in degrees
+
+    Returns:
+        np.ndarray: Points as (n, 2) array of metres
+    """
+    x = np.radians(lon) * np.cos(np.radians(lat0)) * EARTH_RADIUS
+    y = np.radians(lat) * EARTH_RADIUS
+    return np.column_stack((x, y))
+
+def directed_hausdorff(a : np.ndarray, b : np.ndarray, limit : float = np.inf):
+    """Largest distance from a point of a to its nearest point of b
+
+    Args:
+        a (np.ndarray): (n, 2) array of points in metres
+        b (np.ndarray): (m, 2) array of points in metres
+        limit (float, optional): Stops once the distance is known to be above this. Defaults to np.inf.
+
+    Returns:
+        float: Distance in metres, or the first one found above limit
+    """
+    ##Squared distances as |a|^2 + |b|^2 - 2ab, chunked so the matrix stays small
+    b_squared = (b ** 2).sum(axis = 1)
+    worst = 0.0
+    for i in range(0, len(a), 1024):
+        chunk = a[i:i + 1024]
+        squared = (chunk ** 2).sum(axis = 1)[:, None] + b_squared[None, :] - 2 * chunk @ b.T
+        worst = max(worst, squared.min(axis = 1).max())
+        if worst > limit ** 2:
+            break
+    return float(np.sqrt(max(worst, 0.0)))
+
+def hausdorff(a : np.ndarray, b : np.ndarray, limit : float = np.inf):
+    """Symmetric Hausdorff distance between two polylines
+
+    Args:
+        a (np.ndarray): (n, 2) array of points in metres
+        b (np.ndarray): (m, 2) array of points in metres
+        limit (float, optional): Stops once the distance is known to be above this. Defaults to np.inf.
+
+    Returns:
+        float: Distance in metres, or the first one found above limit
+    """
+    ##Centre the points so the squared terms stay small
+    origin = a.mean(axis = 0)
+    a, b = a - origin, b - origin
+    forward = directed_hausdorff(a, b, limit)
+    if forward > limit:
+        return forward
+    return max(forward, directed_hausdorff(b, a, limit))
+
+class PointGrid():
+    """
+    Points of a polyline binned in square cells, for nearest point searches
+    Each cell lists the points in it and its eight neighbours, so every point
+    within one cell size of a position is listed in the position's cell
+    """
+
+    def __init__(self, points : np.ndarray, cell : float):
+        """
+
+        Args:
+            points (np.ndarray): (n, 2) array of points in metres
+            cell (float): Cell size in metres
+        """
+        self.cell = cell
+        ##Padding in the lists points at a point infinitely far away
+        self.x = np.append(points[:, 0], np.inf)
+        self.y = np.append(points[:, 1], np.inf)
+
+        ##A border of two cells, so the outermost cells list no points
+        cells = np.floor(points / cell).astype(np.int64)
+        self.low = cells.min(axis = 0) - 2
+        self.shape = cells.max(axis = 0) - self.low + 3
+        cells -= self.low
+        offsets = np.array([(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)])
+        listed = (cells[:, None, :] + offsets[None, :, :]).reshape(-1, 2)
+        keys = listed[:, 0] * self.shape[1] + listed[:, 1]
+        indices = np.repeat(np.arange(len(points)), len(offsets))
+
+        ##One row per cell with any points listed, and an empty last row
+        order = np.argsort(keys, kind = "stable")
+        keys, indices = keys[order], indices[order]
+        self.keys, rows, counts = np.unique(keys, return_inverse = True, return_counts = True)
+        slots = np.arange(len(keys)) - np.repeat(np.cumsum(counts) - counts, counts)
+        ##Stored as (list length, cells) so reductions over each list run across rows
+        self.table = np.full((counts.max(), len(self.keys) + 1), len(points))
+        self.table[slots, rows] = indices
+
+    def distances(self, positions : np.ndarray):
+        """Squared distances from positions to the points listed in their cells
+
+        Args:
+            positions (np.ndarray): (n, 2) array of positions in metres
+
+        Returns:
+            tuple: (k, n) arrays of point indices and squared distances, inf for padding
+        """
+        ##Positions outside the grid are moved to its border
+        cells = np.clip(np.floor(positions / self.cell).astype(np.int64) - self.low, 0, self.shape - 1)
+        keys = cells[:, 0] * self.shape[1] + cells[:, 1]
+        rows = np.searchsorted(self.keys, keys)
+        ##Cells that list no points get the empty row
+        rows = np.where(np.take(self.keys, rows, mode = "clip") == keys, rows, len(self.keys))
+
+        ##np.take is several times faster than fancy indexing for these gathers
+        indices = np.take(self.table, rows, axis = 1)
+        squared = (np.take(self.x, indices) - positions[:, 0]) ** 2 + (np.take(self.y, indices) - positions[:, 1]) ** 2
+        return indices, squared
+
+##Routes compared at once by hausdorff_many, keeping its (list length, points) arrays small
+ROUTE_BATCH = 16
+
+def hausdorff_many(a : np.ndarray, others : list, limit : float):
+    """Hausdorff distances from one polyline to many, exact up to a limit
+    Nearest points are searched for in grid cells, so the cost grows with the
+    number of points rather than the number of pairs of points
+
+    Args:
+        a (np.ndarray): (n, 2) array of points in metres
+        others (list): Non-empty (m, 2) arrays of points in metres
+        limit (float): Largest distance of interest in metres
+
+    Returns:
+        np.ndarray: Distance in metres to each of others, inf where above limit
+    """
+    distances = np.full(len(others), np.inf)
+    ##Bounding box edges differ by no more than the Hausdorff distance, a cheap first check
+    points = np.concatenate(others)
+    sizes = np.array([len(other) for other in others])
+    starts = np.cumsum(sizes) - sizes
+    low = np.abs(np.minimum.reduceat(points, starts) - a.min(axis = 0)).max(axis = 1)
+    high = np.abs(np.maximum.reduceat(points, starts) - a.max(axis = 0)).max(axis = 1)
+    remaining = np.flatnonzero((low <= limit) & (high <= limit))
+
+    ##Nearest points of similar routes are mostly close, so small cells with short lists find them,
+    ##and the rest are searched for again in cells as large as the limit
+    grid = PointGrid(a, limit / 2)
+    wide_grid = PointGrid(a, limit)
+    current = grid
+    for i in range(0, len(remaining), ROUTE_BATCH):
+        batch = [others[j] for j in remaining[i:i + ROUTE_BATCH]]
+        sizes = np.array([len(other) for other in batch])
+        starts = np.cumsum(sizes) - sizes
+        owner = np.repeat(np.arange(len(batch)), sizes)
+        points = np.concatenate(batch)
+
+        indices, squared = current.distances(points)
+        ##Nearest point of a to each point of the batch
+        forward = squared.min(axis = 0)
+        ##Nearest point of each route in the batch to each point of a
+        backward = np.full((len(batch), len(a)), np.inf)
+        close = squared <= current.cell ** 2
+        np.minimum.at(backward.ravel(), (owner * len(a) + indices)[close], squared[close])
+
+        ##Routes with a nearest point further than a small cell
+        far = (np.logical_or.reduceat(forward > grid.cell ** 2, starts) |
+               (backward > grid.cell ** 2).any(axis = 1))
+        if current is grid and far.any():
+            searched = far[owner]
+            indices, squared = wide_grid.distances(points[searched])
+            forward[searched] = squared.min(axis = 0)
+            ##Nearest points found before are exact too, so finding them again changes nothing
+            close = squared <= limit ** 2
+            np.minimum.at(backward.ravel(), (owner[searched] * len(a) + indices)[close], squared[close])
+        ##Skip the small cells while most routes are not close enough for them
+        current = wide_grid if far.mean() > 0.5 else grid
+
+        worst = np.maximum(np.maximum.reduceat(forward, starts), backward.max(axis = 1))
+        distances[remaining[i:i + ROUTE_BATCH]] = np.sqrt(worst)
+
+    ##Distances beyond the limit are only bounds, as nearest points may be outside the searched cells
+    distances[distances > limit] = np.inf
+    return distances
+
+class RouteIndex():
+    """
+    Spatial index of the routes of all cached activities
+    Each route is registered in the grid cells it passes through, so candidates
+    for a query are found without looking at any other route
+    """
+
+    def __init__(self, cell_size : float = 0.002, spacing : float = 20):
+        """
+
+        Args:
+            cell_size (float, optional): Grid cell size in degrees, about 200m. Defaults to 0.002.
+            spacing (float, optional): Spacing of simplified routes in metres. Defaults to 20.
+        """
+        self.cell_size = cell_size
+        self.spacing = spacing
+        ##Activity ID -> Route
+        self.routes = {}
+        ##Grid cell -> set of activity IDs
+        self.cells = {}
+        ##Activity ID -> number of cells the route passes through
+        self.cell_counts = {}
+
+    def cells_of(self, lat : np.ndarray, lon : np.ndarray):
+        """Grid cells containing any of the points
+
+        Args:
+            lat (np.ndarray): Latitudes in degrees
+            lon (np.ndarray): Longitudes in degrees
+
+        Returns:
+            set: Cells as (row, column) pairs
+        """
+        rows = np.floor(lat / self.cell_size).astype(np.int64)
+        cols = np.floor(lon / self.cell_size).astype(np.int64)
+        return set(zip(rows.tolist(), cols.tolist()))
+
+    def neighbourhood(self, cell : tuple):
+        """A cell and its eight neighbours
+        """
+        row, col = cell
+        return [(row + dr, col + dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)]
+
+    def add(self, activity_id, track : Track):
+        """Adds an activity to the index, replacing any earlier entry
+
+        Args:
+            activity_id (str): Activity ID
+            track (Track): Full track of activity
+        """
+        self.remove(activity_id)
+        route = Route.from_track(track, self.spacing)
+        self._register(activity_id, route)
+
+    def _register(self, activity_id, route : Route):
+        ##Empty routes are kept so they are not re-added, but get no cells
+        cells = self.cells_of(route.lat, route.lon) if len(route) else set()
+        self.routes[activity_id] = route
+        self.cell_counts[activity_id] = len(cells)
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(activity_id)
+
+    def remove(self, activity_id):
+        """Removes an activity from the index
+
+        Args:
+            activity_id (str): Activity ID
+        """
+        route = self.routes.pop(activity_id, None)
+        if route is None:
+            return
+        del self.cell_counts[activity_id]
+        for cell in self.cells_of(route.lat, route.lon):
+            self.cells[cell].discard(activity_id)
+            if not self.cells[cell]:
+                del self.cells[cell]
+
+    def update(self, cache : TrackCache):
+        """Adds all cached tracks that are not indexed yet
+
+        Args:
+            cache (TrackCache): Track cache
+
+        Returns:
+            list: Activity IDs added to the index
+        """
+        added = [act_id for act_id in cache.ids() if act_id not in self.routes]
+        for act_id in added:
+            self.add(act_id, cache.get(act_id))
+        return added
+
+    def save(self, path : str):
+        """Saves the simplified routes, the grid is rebuilt on load
+
+        Args:
+            path (str): File path
+        """
+        routes = {act_id : (r.lat, r.lon, r.time) for act_id, r in self.routes.items()}
+        with open(path, "wb") as f:
+            pickle.dump({"cell_size" : self.cell_size, "spacing" : self.spacing, "routes" : routes}, f)
+
+    @staticmethod
+    def load(path : str):
+        """Loads an index saved with RouteIndex.save
+
+        Args:
+            path (str): File path
+
+        Returns:
+            RouteIndex: Loaded index
+        """
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        index = RouteIndex(data["cell_size"], data["spacing"])
+        for act_id, (lat, lon, time) in data["routes"].items():
+            index._register(act_id, Route(lat, lon, time))
+        return index
+
+    def similar(self, route : Route, max_distance : float = 50, min_overlap : float = 0.7):
+        """Finds activities that followed the same route
+
+        Args:
+            route (Route): Route to compare against, e.g. self.routes[activity_id]
+            max_distance (float, optional): Largest Hausdorff distance in metres. Defaults to 50.
+            min_overlap (float, optional): Fraction of cells a candidate must share. Defaults to 0.7.
+
+        Returns:
+            list: (activity ID, distance) pairs, most similar first
+        """
+        if len(route) == 0:
+            return []
+        query_cells = self.cells_of(route.lat, route.lon)
+
+        ##Count shared cells for every route touching the query
+        shared = Counter()
+        for cell in query_cells:
+            shared.update(self.cells.get(cell, ()))
+
+        lat0 = float(np.mean(route.lat))
+        points = project(route.lat, route.lon, lat0)
+        candidates = []
+        for act_id, count in shared.items():
+            ##Both routes must mostly cover the same cells
+            if count < min_overlap * len(query_cells) or count < min_overlap * self.cell_counts[act_id]:
+                continue
+            candidates.append(act_id)
+        if not candidates:
+            return []
+
+        others = [project(self.routes[act_id].lat, self.routes[act_id].lon, lat0) for act_id in candidates]
+        distances = hausdorff_many(points, others, max_distance)
+        matches = [(act_id, float(distance)) for act_id, distance in zip(candidates, distances) if distance <= max_distance]
+        matches.sort(key = lambda match : match[1])
+        return matches
+
+    def match_segment(self, segment : Route, tolerance : float = 25):
+        """Finds every activity that ran a segment and ranks them by time
+
+        Args:
+            segment (Route): Segment polyline, e.g. from Route.from_track on part of a track
+            tolerance (float, optional): Largest distance from the segment in metres. Defaults to 25.
+
+        Returns:
+            list: (activity ID, seconds) pairs of each activity's best effort, fastest first
+        """
+        if len(segment) == 0:
+            return []
+        lat0 = float(np.mean(segment.lat))
+        seg_points = project(segment.lat, segment.lon, lat0)
+        seg_start, seg_end = seg_points[0], seg_points[-1]
+
+        ##Candidates pass near both ends and through all cells of the segment
+        start_cell = next(iter(self.cells_of(segment.lat[:1], segment.lon[:1])))
+        end_cell = next(iter(self.cells_of(segment.lat[-1:], segment.lon[-1:])))
+        candidates = set().union(*(self.cells.get(c, set()) for c in self.neighbourhood(start_cell)))
+        candidates &= set().union(*(self.cells.get(c, set()) for c in self.neighbourhood(end_cell)))
+        for cell in self.cells_of(segment.lat, segment.lon):
+            candidates &= set().union(*(self.cells.get(c, set()) for c in self.neighbourhood(cell)))
+
+        efforts = []
+        for act_id in candidates:
+            route = self.routes[act_id]
+            if len(route) == 0:
+                continue
+            points = project(route.lat, route.lon, lat0)
+            near_start = np.flatnonzero(np.hypot(*(points - seg_start).T) <= tolerance)
+            near_end = np.flatnonzero(np.hypot(*(points - seg_end).T) <= tolerance)
+
+            best = None
+            for i in self._passes(near_start, points, seg_start):
+                ##First arrival at the end after leaving the start
+                after = near_end[near_end > i]
+                if len(after) == 0:
+                    break
+                j = after[0]
+                seconds = route.time[j] - route.time[i]
+                if best is not None and seconds >= best:
+                    continue
+                if hausdorff(points[i:j + 1], seg_points, 2 * tolerance) <= 2 * tolerance:
+                    best = seconds
+            if best is not None:
+                efforts.append((act_id, float(best)))
+
+        efforts.sort(key = lambda effort : effort[1])
+        return efforts
+
+    def _passes(self, near : np.ndarray, points : np.ndarray, target : np.ndarray):
+        """Closest point of each separate pass near a target
+
+        Args:
+            near (np.ndarray): Sorted indices of points near the target
+            points (np.ndarray): (n, 2) array of route points in metres
+            target (np.ndarray): Target point in metres
+
+        Yields:
+            int: Index of closest point for each pass
+        """
+        if len(near) == 0:
+            return
+        ##Runs of consecutive indices are one pass
+        breaks = np.flatnonzero(np.diff(near) > 1) + 1
+        for run in np.split(near, breaks):
+            yield run[np.argmin(np.hypot(*(points[run] - target).T))]
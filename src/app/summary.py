@@ -0,0 +1,58 @@
+from datetime import datetime
+from io import BytesIO
+from xml.etree.ElementTree import parse
+
+from api import API
+from laps import LapData
+
+##Categories read from the csv summary row by default
+CSV_CATEGORIES = ["Time", "Distance", "Elevation Gain", "Avg Pace", "Avg HR"]
+
+def read_location(gpx_data : BytesIO):
+    """Reads the location title of an activity
+
+    Args:
+        gpx_data (BytesIO): In memory gpx file for activity
+
+    Returns:
+        str: Location title
+    """
+    root = parse(gpx_data).getroot()
+
+    namespace = {"gpx" : "http://www.topografix.com/GPX/1/1"}
+    location = root.find(".//gpx:name", namespace)
+
+    return str(location.text)
+
+def read_csv_summary(csv_data : BytesIO, categories : list = CSV_CATEGORIES):
+    """Reads the summary values of an activity
+
+    Args:
+        csv_data (BytesIO): In memory csv file for activity
+        categories (list, optional): Csv columns to read. Defaults to CSV_CATEGORIES.
+
+    Returns:
+        dict: Category -> value for whole activity
+    """
+    laps = LapData.from_csv(csv_data)
+    return {cat : laps.value(None, cat) for cat in categories}
+
+def summarise_activity(api : API, activity : dict, categories : list = CSV_CATEGORIES):
+    """Summary of an activity, as shown by ActivitySummaryWidget
+
+    Args:
+        api (API): Garmin API instance
+        activity (dict): JSON description of activity
+        categories (list, optional): Csv columns to read. Defaults to CSV_CATEGORIES.
+
+    Returns:
+        dict: Date, Location and csv categories
+    """
+    act_id = activity["activityId"]
+    date = datetime.strptime(activity["startTimeLocal"], "%Y-%m-%d %H:%M:%S")
+    summary = {
+        "Date" : date.strftime("%Y-%m-%d"),
+        "Location" : read_location(api.get_gpx_data(act_id)),
+    }
+    summary.update(read_csv_summary(BytesIO(api.get_csv_data(act_id)), categories))
+    return summary
@@ -0,0 +1,263 @@
+import os
+import numpy as np
+from datetime import datetime
+from io import BytesIO
+from xml.etree.ElementTree import parse
+
+from api import API
+
+##Default location of cached tracks
+TRACK_CACHE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "activity_files", "tracks")
+
+EARTH_RADIUS = 6371008.8
+
+class Track():
+    """
+    Trackpoints of an activity held as arrays
+    Times are seconds since the first trackpoint
+    """
+
+    def __init__(self, lat : np.ndarray, lon : np.ndarray, ele : np.ndarray, time : np.ndarray, hr : np.ndarray, start : datetime = None):
+        """
+
+        Args:
+            lat (np.ndarray): Latitudes in degrees
+            lon (np.ndarray): Longitudes in degrees
+            ele (np.ndarray): Elevations in metres, NaN where missing
+            time (np.ndarray): Seconds since start
+            hr (np.ndarray): Heart rate in bpm, NaN where missing
+            start (datetime, optional): Time of first trackpoint. Defaults to None.
+        """
+        self.lat = lat
+        self.lon = lon
+        self.ele = ele
+        self.time = time
+        self.hr = hr
+        self.start = start
+
+    def __len__(self):
+        return len(self.lat)
+
+    def distance(self):
+        """Cumulative distance along the track
+
+        Returns:
+            np.ndarray: Metres from start at each trackpoint
+        """
+        steps = haversine(self.lat[:-1], self.lon[:-1], self.lat[1:], self.lon[1:])
+        return np.concatenate(([0.0], np.cumsum(steps)))[:len(self.lat)]
+
+    def pace(self, window : float = 10, slowest : float = 20):
+        """Pace over a trailing time window
+
+        Args:
+            window (float, optional): Seconds averaged over. Defaults to 10.
+            slowest (float, optional): Slower paces are treated as stopped. Defaults to 20.
+
+        Returns:
+            np.ndarray: Minutes per km at each trackpoint, NaN when stopped
+        """
+        if len(self) < 2:
+            return np.full(len(self), np.nan)
+        distance = self.distance()
+        earlier = np.maximum(self.time - window, self.time[0])
+        covered = distance - np.interp(earlier, self.time, distance)
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            pace = (self.time - earlier) / covered * 1000 / 60
+        pace[~(pace <= slowest)] = np.nan
+        return pace
+
+    def save(self, path : str):
+        """Saves the track to a .npz file
+
+        Args:
+            path (str): File path
+        """
+        start = self.start.isoformat() if self.start else ""
+        with open(path, "wb") as f:
+            np.savez_compressed(f, lat = self.lat, lon = self.lon, ele = self.ele, time = self.time, hr = self.hr, start = start)
+
+    @staticmethod
+    def load(path : str):
+        """Loads a track saved with Track.save
+
+        Args:
+            path (str): File path
+
+        Returns:
+            Track: Loaded track
+        """
+        with np.load(path) as data:
+            start = str(data["start"])
+            return Track(data["lat"], data["lon"], data["ele"], data["time"], data["hr"],
+                         datetime.fromisoformat(start) if start else None)
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great circle distance between points, vectorised over arrays
+
+    Args:
+        lat1, lon1, lat2, lon2 (np.ndarray or float): Coordinates in degrees
+
+    Returns:
+        np.ndarray: Distances in metres
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+def parse_gpx(gpx_data : BytesIO):
+    """Reads the trackpoints of a gpx file
+
+    Args:
+        gpx_data (BytesIO): In memory gpx file for activity
+
+    Returns:
+        Track: Trackpoints of all segments in order
+    """
+    namespace = {
+        "gpx" : "http://www.topografix.com/GPX/1/1",
+        "tpx" : "http://www.garmin.com/xmlschemas/TrackPointExtension/v1",
+    }
+    root = parse(gpx_data).getroot()
+    points = root.findall(".//gpx:trkpt", namespace)
+
+    lat = np.array([float(p.get("lat")) for p in points])
+    lon = np.array([float(p.get("lon")) for p in points])
+    ele = np.array([_float(p.find("gpx:ele", namespace)) for p in points])
+    hr = np.array([_float(p.find(".//tpx:hr", namespace)) for p in points])
+    times = [_time(p.find("gpx:time", namespace)) for p in points]
+    time, start = _relative_times(times)
+    return Track(lat, lon, ele, time, hr, start)
+
+def parse_tcx(tcx_data : BytesIO):
+    """Reads the trackpoints of a tcx file
+    Trackpoints without a position are skipped
+
+    Args:
+        tcx_data (BytesIO): In memory tcx file for activity
+
+    Returns:
+        Track: Trackpoints of all laps in order
+    """
+    namespace = {"tcx" : "http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2"}
+    root = parse(tcx_data).getroot()
+    points = [p for p in root.findall(".//tcx:Trackpoint", namespace) if p.find("tcx:Position", namespace) is not None]
+
+    lat = np.array([float(p.find(".//tcx:LatitudeDegrees", namespace).text) for p in points])
+    lon = np.array([float(p.find(".//tcx:LongitudeDegrees", namespace).text) for p in points])
+    ele = np.array([_float(p.find("tcx:AltitudeMeters", namespace)) for p in points])
+    hr = np.array([_float(p.find("tcx:HeartRateBpm/tcx:Value", namespace)) for p in points])
+    times = [_time(p.find("tcx:Time", namespace)) for p in points]
+    time, start = _relative_times(times)
+    return Track(lat, lon, ele, time, hr, start)
+
+def _float(element):
+    return float(element.text) if element is not None else np.nan
+
+def _time(element):
+    return datetime.fromisoformat(element.text.replace("Z", "+00:00")) if element is not None else None
+
+def _relative_times(times : list):
+    """Converts trackpoint times to seconds since the first one
+    Missing times are interpolated from their neighbours
+    """
+    known = [t for t in times if t is not None]
+    if not known:
+        return np.arange(len(times), dtype = float), None
+    start = known[0]
+    seconds = np.array([(t - start).total_seconds() if t is not None else np.nan for t in times])
+    missing = np.isnan(seconds)
+    if missing.any():
+        index = np.arange(len(seconds))
+        seconds[missing] = np.interp(index[missing], index[~missing], seconds[~missing])
+    return seconds, start
+
+class TrackCache():
+    """
+    Directory of parsed tracks, one .npz file per activity
+    Tracks are only downloaded from Garmin Connect once
+    """
+
+    def __init__(self, directory : str = TRACK_CACHE):
+        """
+
+        Args:
+            directory (str, optional): Cache directory. Defaults to TRACK_CACHE.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok = True)
+
+    def path(self, activity_id):
+        return os.path.join(self.directory, f"{activity_id}.npz")
+
+    def __contains__(self, activity_id):
+        return os.path.exists(self.path(activity_id))
+
+    def ids(self):
+        """Activity IDs of all cached tracks
+
+        Returns:
+            list: Activity IDs
+        """
+        return [int(name[:-4]) for name in os.listdir(self.directory) if name.endswith(".npz")]
+
+    def get(self, activity_id):
+        """Loads a cached track
+
+        Args:
+            activity_id (str): Activity ID
+
+        Returns:
+            Track: Cached track, None if not cached
+        """
+        if activity_id not in self:
+            return None
+        return Track.load(self.path(activity_id))
+
+    def put(self, activity_id, track : Track):
+        """Adds a track to the cache
+
+        Args:
+            activity_id (str): Activity ID
+            track (Track): Parsed track
+        """
+        ##Write then rename so a partly written file is never read
+        temp = self.path(activity_id) + ".tmp"
+        track.save(temp)
+        os.replace(temp, self.path(activity_id))
+
+    def fetch(self, api : API, activity_id):
+        """Gets a track from the cache, downloading it if needed
+
+        Args:
+            api (API): Garmin API instance
+            activity_id (str): Activity ID
+
+        Returns:
+            Track: Track of activity
+        """
+        track = self.get(activity_id)
+        if track is None:
+            track = parse_gpx(api.get_gpx_data(activity_id))
+            self.put(activity_id, track)
+        return track
+
+    def sync(self, api : API, start_date : datetime, end_date : datetime, activity_type : str = "running"):
+        """Downloads the tracks of all activities in a date range that are not cached yet
+
+        Args:
+            api (API): Garmin API instance
+            start_date (datetime): Start of date range
+            end_date (datetime): End of date range
+            activity_type (str, optional): Activity type in garmin. Defaults to "running".
+
+        Returns:
+            list: Activity IDs of newly cached tracks
+        """
+        added = []
+        for act in api.get_activities_by_date(start_date, end_date, activity_type):
+            act_id = act["activityId"]
+            if act_id not in self:
+                self.fetch(api, act_id)
+                added.append(act_id)
+        return added